@@ -0,0 +1,118 @@
+"""每場遊戲一個 actor：序列化遊戲狀態的變更
+
+call / pass / reverse / AI 行動都會修改 GameState，之後再 await 廣播；
+若兩個請求同時進行，廣播期間另一個請求可能已經改了回合順序。
+所有變更改為送進該遊戲的指令佇列，由單一 actor 工作依序執行：
+
+  - 指令是同步函式，執行期間不會 await，因此不會與其他指令交錯
+  - actor 一次取出佇列中所有待處理的指令 (最多 ACTOR_BATCH_MAX 個) 連續執行，
+    整批完成後只呼叫一次 on_batch (同步：排入 AI 回合並組好廣播內容)
+  - on_batch 回傳的送出協程交給該遊戲的送出鏈：依批次順序送出，送完後才把
+    結果交給呼叫端；actor 不等待送出，可以繼續處理下一批
+  - 不同遊戲的 actor 互不影響，不需要全域鎖；佇列清空後 actor 工作即結束，
+    閒置的遊戲不佔用任何工作
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+ACTOR_BATCH_MAX = int(os.environ.get("ACTOR_BATCH_MAX", "64"))
+
+Command = Callable[[], object]
+Outcome = Tuple[asyncio.Future, object, Optional[BaseException]]
+
+
+class GameActors:
+    def __init__(self, batch_max: int = ACTOR_BATCH_MAX):
+        self.batch_max = batch_max
+        self._queues: Dict[str, List[Tuple[Command, asyncio.Future]]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # 每場遊戲最後一個送出工作，下一批的送出排在它之後
+        self._deliveries: Dict[str, asyncio.Task] = {}
+        # 每批指令執行完後的處理 (由 main 設定)，參數為 game_id，
+        # 回傳要送出的協程 (沒有要送出時為 None)
+        self.on_batch: Optional[Callable[[str], Optional[Awaitable[None]]]] = None
+        self.commands = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.errors = 0
+
+    async def submit(self, game_id: str, command: Command):
+        """把指令排入 game_id 的 actor，回傳指令的結果 (或拋出指令的例外)"""
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(game_id, []).append((command, future))
+        task = self._tasks.get(game_id)
+        if task is None or task.done():
+            self._tasks[game_id] = asyncio.get_running_loop().create_task(self._run(game_id))
+        return await future
+
+    async def _run(self, game_id: str):
+        queue = self._queues[game_id]
+        try:
+            while queue:
+                batch = queue[:self.batch_max]
+                del queue[:self.batch_max]
+                await self._run_batch(game_id, batch)
+        finally:
+            if self._tasks.get(game_id) is asyncio.current_task():
+                del self._tasks[game_id]
+                if not queue:
+                    del self._queues[game_id]
+
+    async def _run_batch(self, game_id: str, batch: List[Tuple[Command, asyncio.Future]]):
+        self.batches += 1
+        self.commands += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+        outcomes: List[Outcome] = []
+        for command, future in batch:
+            try:
+                outcomes.append((future, command(), None))
+            except Exception as e:
+                outcomes.append((future, None, e))
+
+        delivery = None
+        if self.on_batch is not None and any(error is None for _, _, error in outcomes):
+            try:
+                delivery = self.on_batch(game_id)
+            except Exception as e:
+                self.errors += 1
+                print(f"[Actor] batch handler failed for game {game_id}: {e!r}")
+
+        previous = self._deliveries.get(game_id)
+        self._deliveries[game_id] = asyncio.get_running_loop().create_task(
+            self._deliver(game_id, previous, delivery, outcomes))
+        # 讓出執行權：送出工作開始執行，同時到達的請求併入下一批
+        await asyncio.sleep(0)
+
+    async def _deliver(self, game_id: str, previous: Optional[asyncio.Task],
+                       delivery: Optional[Awaitable[None]], outcomes: List[Outcome]):
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            if delivery is not None:
+                await delivery
+        except Exception as e:
+            self.errors += 1
+            print(f"[Actor] delivery failed for game {game_id}: {e!r}")
+        finally:
+            for future, result, error in outcomes:
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            if self._deliveries.get(game_id) is asyncio.current_task():
+                del self._deliveries[game_id]
+
+    def stats(self) -> dict:
+        return {
+            "active": sum(1 for t in self._tasks.values() if not t.done()),
+            "queued": sum(len(q) for q in self._queues.values()),
+            "delivering": len(self._deliveries),
+            "commands": self.commands,
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+            "errors": self.errors,
+            "batch_max": self.batch_max,
+        }
@@ -0,0 +1,69 @@
+"""伺服器端 AI 回合排程
+
+任何行動之後若輪到 AI，排入一個 asyncio 工作：等待思考時間後執行 AI 決策，
+結果透過房間 WebSocket 推送，客戶端不需要再呼叫 /api/game/ai-action。
+每場遊戲最多一個待執行的回合 (遊戲結束時取消)，同時執行的 AI 回合數有上限。
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+AI_THINK_DELAY_MS = int(os.environ.get("AI_THINK_DELAY_MS", "1500"))
+AI_MAX_CONCURRENT = int(os.environ.get("AI_MAX_CONCURRENT", "32"))
+
+
+class AITurnScheduler:
+    def __init__(self, think_delay_ms: int = AI_THINK_DELAY_MS,
+                 max_concurrent: int = AI_MAX_CONCURRENT):
+        self.think_delay = think_delay_ms / 1000
+        self.max_concurrent = max_concurrent
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # 實際執行 AI 回合的協程 (由 main 設定)，參數為 game_id
+        self.run_turn: Optional[Callable[[str], Awaitable[None]]] = None
+        self.turns_run = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    def schedule(self, game_id: str):
+        """排入 game_id 的下一個 AI 回合 (已有待執行的回合時不重複排入)"""
+        task = self._tasks.get(game_id)
+        if task is not None and not task.done():
+            return
+        self._tasks[game_id] = asyncio.get_running_loop().create_task(self._run(game_id))
+
+    def cancel(self, game_id: str):
+        task = self._tasks.pop(game_id, None)
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+            self.cancelled += 1
+
+    async def _run(self, game_id: str):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.sleep(self.think_delay)
+            async with self._semaphore:
+                # 先移除自己，AI 行動後若又輪到 AI 才能排入下一個回合
+                if self._tasks.get(game_id) is asyncio.current_task():
+                    del self._tasks[game_id]
+                self.turns_run += 1
+                await self.run_turn(game_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            print(f"[AI] turn failed for game {game_id}: {e!r}")
+        finally:
+            if self._tasks.get(game_id) is asyncio.current_task():
+                del self._tasks[game_id]
+
+    def stats(self) -> dict:
+        return {
+            "pending": sum(1 for t in self._tasks.values() if not t.done()),
+            "turns_run": self.turns_run,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "think_delay_ms": int(self.think_delay * 1000),
+            "max_concurrent": self.max_concurrent,
+        }
@@ -0,0 +1,76 @@
+"""號碼盤的位元遮罩表示法
+
+範圍最多 1-30，號碼 n 對應第 n 個位元，已喊過的號碼、可用號碼與
+一次喊出的號碼都以一個 int 表示；成員判斷、可用號碼計算與
+連續號碼搜尋都是幾個位元運算。
+"""
+from typing import Iterable, List, Optional, Tuple
+
+
+def mask_of(numbers: Iterable[int]) -> int:
+    mask = 0
+    for n in numbers:
+        mask |= 1 << n
+    return mask
+
+
+def range_mask(lower: int, upper: int) -> int:
+    """lower..upper (含) 全部設為 1"""
+    if upper < lower:
+        return 0
+    return ((1 << (upper - lower + 1)) - 1) << lower
+
+
+# 每個位元組各值對應的號碼，4 個位元組涵蓋 0-31
+_BYTE_NUMBERS = [[[shift + i for i in range(8) if value >> i & 1] for value in range(256)]
+                 for shift in (0, 8, 16, 24)]
+
+
+def numbers_of(mask: int) -> List[int]:
+    """遮罩內的號碼 (遞增排序)"""
+    if 0 <= mask < 1 << 32:
+        b0, b1, b2, b3 = _BYTE_NUMBERS
+        return (b0[mask & 0xFF] + b1[mask >> 8 & 0xFF]
+                + b2[mask >> 16 & 0xFF] + b3[mask >> 24])
+    numbers = []
+    while mask:
+        low = mask & -mask
+        numbers.append(low.bit_length() - 1)
+        mask ^= low
+    return numbers
+
+
+def count(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def available_mask(lower: int, upper: int, called: int) -> int:
+    """範圍內尚未喊過的號碼"""
+    return range_mask(lower, upper) & ~called
+
+
+def is_consecutive(numbers: List[int]) -> bool:
+    """號碼是否為不重複的連續整數"""
+    ordered = sorted(numbers)
+    return all(ordered[i + 1] - ordered[i] == 1 for i in range(len(ordered) - 1))
+
+
+def first_run(mask: int, length: int) -> Optional[int]:
+    """遮罩中第一段長度為 length 的連續號碼的起點 (沒有則回傳 None)"""
+    runs = mask
+    for shift in range(1, length):
+        runs &= mask >> shift
+    if not runs:
+        return None
+    return (runs & -runs).bit_length() - 1
+
+
+def narrow_range(lower: int, upper: int, called: int, secret: int) -> Tuple[int, int]:
+    """沒踩中密碼時，把範圍縮到這次喊出的號碼之外"""
+    below = called & ((1 << secret) - 1)
+    above = called >> (secret + 1)
+    if below:
+        lower = max(lower, below.bit_length())
+    if above:
+        upper = min(upper, secret + (above & -above).bit_length() - 1)
+    return lower, upper
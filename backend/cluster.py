@@ -0,0 +1,344 @@
+"""多程序部署的狀態分區與訊息傳遞
+
+房間與遊戲的狀態只存在於「擁有者」worker (owner_of(key) = crc32(key) % workers)，
+新的房間 id / game_id 都挑選由本 worker 擁有的值，因此任何 worker 只看 id
+就能知道該把請求轉給誰 (room affinity)；房間內的遊戲與房間同屬一個 worker。
+
+兩種實作：
+  LocalCluster      - 單一程序 (預設)，所有 key 都屬於本程序，訊息直接在本地處理
+  UnixSocketCluster - GAME_WORKERS > 1 時使用 (例如 uvicorn --workers N)；
+                      每個 worker 以 flock 取得編號，並在 GAME_CLUSTER_DIR 下
+                      開一個 Unix socket，worker 之間以換行分隔的 JSON 互傳：
+                        publish()  廣播給所有 worker (WebSocket 扇出、排行榜更新)
+                        request()  送到指定 worker 並等待回覆 (轉送 HTTP / WebSocket 訊息)
+                        gather()   送到所有 worker 並收集回覆 (合併房間列表)
+不需要任何網路連線，也不需要額外的 broker。
+
+訊息為 dict，依 "kind" 交給 on(kind, handler) 註冊的協程處理，回傳值即為回覆。
+"""
+import asyncio
+import fcntl
+import itertools
+import json
+import os
+import tempfile
+import uuid
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional
+
+GAME_WORKERS = int(os.environ.get("GAME_WORKERS", "1"))
+GAME_CLUSTER_DIR = os.environ.get(
+    "GAME_CLUSTER_DIR", os.path.join(tempfile.gettempdir(), "ultimate-code-cluster"))
+CLUSTER_REQUEST_TIMEOUT = float(os.environ.get("CLUSTER_REQUEST_TIMEOUT", "5.0"))
+
+Handler = Callable[[dict], Awaitable[Optional[dict]]]
+
+
+class ClusterUnavailable(Exception):
+    """目標 worker 無法連線或逾時"""
+
+
+def owner_of(key, workers: int) -> int:
+    return zlib.crc32(str(key).encode()) % workers
+
+
+class LocalCluster:
+    workers = 1
+    worker_index = 0
+
+    def __init__(self):
+        self._handlers: Dict[str, Handler] = {}
+        self.published = 0
+
+    def on(self, kind: str, handler: Handler):
+        self._handlers[kind] = handler
+
+    def owner_of(self, key) -> int:
+        return owner_of(key, self.workers)
+
+    def owns(self, key) -> bool:
+        return self.owner_of(key) == self.worker_index
+
+    def local_uuid(self) -> str:
+        """由本 worker 擁有的新 uuid"""
+        while True:
+            value = str(uuid.uuid4())
+            if self.owns(value):
+                return value
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def _dispatch(self, message: dict) -> Optional[dict]:
+        handler = self._handlers.get(message.get("kind"))
+        if handler is None:
+            return None
+        return await handler(message)
+
+    async def publish(self, message: dict, local: bool = True):
+        """送給所有 worker (local=False 時不含自己)"""
+        self.published += 1
+        if local:
+            await self._dispatch(message)
+
+    def publish_nowait(self, message: dict, local: bool = True):
+        """在同步程式中排入 publish (沒有執行中的事件迴圈時略過)"""
+        if not local and self.workers == 1:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.publish(message, local))
+
+    async def request(self, worker: int, message: dict) -> Optional[dict]:
+        return await self._dispatch(message)
+
+    async def gather(self, message: dict) -> List[Optional[dict]]:
+        return [await self._dispatch(message)]
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "workers": self.workers,
+            "worker_index": self.worker_index,
+            "published": self.published,
+        }
+
+
+class _Peer:
+    """連到另一個 worker 的持久連線 (斷線後下次使用時重連)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        try:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        except OSError as e:
+            raise ClusterUnavailable(f"{self.path}: {e}") from e
+        self._read_task = asyncio.get_running_loop().create_task(self._read_replies())
+
+    async def _read_replies(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                future = self._pending.pop(frame.get("reply_to"), None)
+                if future is not None and not future.done():
+                    future.set_result(frame.get("message"))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ClusterUnavailable(f"{self.path}: connection lost"))
+            self._pending.clear()
+
+    async def send(self, message: dict, want_reply: bool,
+                   timeout: float = CLUSTER_REQUEST_TIMEOUT) -> Optional[dict]:
+        async with self._lock:
+            await self._connect()
+            frame_id = next(self._ids) if want_reply else None
+            future = None
+            if want_reply:
+                future = asyncio.get_running_loop().create_future()
+                self._pending[frame_id] = future
+            try:
+                self._writer.write(json.dumps({"id": frame_id, "message": message},
+                                              ensure_ascii=False).encode() + b"\n")
+                await self._writer.drain()
+            except OSError as e:
+                self._pending.pop(frame_id, None)
+                self._writer = None
+                raise ClusterUnavailable(f"{self.path}: {e}") from e
+        if future is None:
+            return None
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(frame_id, None)
+            raise ClusterUnavailable(f"{self.path}: timed out")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None:
+            self._read_task.cancel()
+
+
+class UnixSocketCluster(LocalCluster):
+    def __init__(self, workers: int = GAME_WORKERS, directory: str = GAME_CLUSTER_DIR):
+        super().__init__()
+        self.workers = workers
+        self.directory = directory
+        self.worker_index = -1
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Dict[int, _Peer] = {}
+        self.forwarded = 0
+        self.errors = 0
+
+    def socket_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"worker-{index}.sock")
+
+    def _claim_slot(self) -> int:
+        # 以 flock 取得第一個空的編號；程序結束時鎖自動釋放
+        os.makedirs(self.directory, exist_ok=True)
+        for index in range(self.workers):
+            f = open(os.path.join(self.directory, f"worker-{index}.lock"), "w")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            self._lock_file = f
+            return index
+        raise RuntimeError(f"all {self.workers} cluster slots in {self.directory} are taken")
+
+    async def start(self):
+        if self.worker_index < 0:
+            self.worker_index = self._claim_slot()
+        path = self.socket_path(self.worker_index)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._serve, path=path)
+        self._peers = {i: _Peer(self.socket_path(i))
+                       for i in range(self.workers) if i != self.worker_index}
+        print(f"[Cluster] worker {self.worker_index}/{self.workers} listening on {path}")
+
+    async def stop(self):
+        for peer in self._peers.values():
+            await peer.close()
+        if self._server is not None:
+            self._server.close()
+            try:
+                os.unlink(self.socket_path(self.worker_index))
+            except OSError:
+                pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+
+        async def handle(frame: dict):
+            try:
+                reply = await self._dispatch(frame["message"])
+            except Exception as e:
+                self.errors += 1
+                print(f"[Cluster] handler failed for {frame['message'].get('kind')}: {e!r}")
+                reply = None
+            if frame.get("id") is not None:
+                async with write_lock:
+                    writer.write(json.dumps({"reply_to": frame["id"], "message": reply},
+                                            ensure_ascii=False).encode() + b"\n")
+                    await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                asyncio.get_running_loop().create_task(handle(json.loads(line)))
+        except (OSError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def publish(self, message: dict, local: bool = True):
+        self.published += 1
+        sends = [self._send_quietly(peer, message) for peer in self._peers.values()]
+        if local:
+            sends.append(self._dispatch(message))
+        await asyncio.gather(*sends)
+
+    async def _send_quietly(self, peer: _Peer, message: dict):
+        try:
+            await peer.send(message, want_reply=False)
+        except ClusterUnavailable as e:
+            self.errors += 1
+            print(f"[Cluster] publish failed: {e}")
+
+    async def request(self, worker: int, message: dict) -> Optional[dict]:
+        if worker == self.worker_index:
+            return await self._dispatch(message)
+        self.forwarded += 1
+        return await self._peers[worker].send(message, want_reply=True)
+
+    async def gather(self, message: dict) -> List[Optional[dict]]:
+        return list(await asyncio.gather(*(self.request(i, message)
+                                           for i in range(self.workers))))
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "socket": self.socket_path(self.worker_index),
+            "forwarded": self.forwarded,
+            "errors": self.errors,
+        }
+
+
+def create_cluster() -> LocalCluster:
+    return UnixSocketCluster() if GAME_WORKERS > 1 else LocalCluster()
+
+
+FORWARDED_HEADER = "x-cluster-forwarded"
+
+
+async def call_asgi(app, message: dict) -> dict:
+    """在本程序執行轉送來的 HTTP 請求 ({"method", "path", "query", "headers", "body"})"""
+    body = message.get("body", "").encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": message["method"],
+        "scheme": "http",
+        "path": message["path"],
+        "raw_path": message["path"].encode(),
+        "query_string": message.get("query", "").encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in message.get("headers", [])]
+                   + [(FORWARDED_HEADER.encode(), b"1")],
+        "client": ("cluster", 0),
+        "server": ("cluster", 0),
+    }
+    sent = False
+    never = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await never.wait()
+
+    response = {"status": 500, "headers": [], "body": ""}
+    chunks = []
+
+    async def send(event):
+        if event["type"] == "http.response.start":
+            response["status"] = event["status"]
+            response["headers"] = [[k.decode(), v.decode()] for k, v in event.get("headers", [])]
+        elif event["type"] == "http.response.body":
+            chunks.append(event.get("body", b""))
+
+    await app(scope, receive, send)
+    response["body"] = b"".join(chunks).decode()
+    return response
@@ -0,0 +1,250 @@
+"""WebSocket 連線管理
+
+廣播時訊息只序列化一次 (有安裝 orjson 時使用 orjson)，再放進每條連線各自的
+送出佇列；每條連線由自己的 writer 工作依序送出，廣播本身不會等待任何客戶端：
+
+  - 佇列有上限 (WS_QUEUE_MAX)，客戶端跟不上時依 WS_OVERFLOW_POLICY 處理：
+      drop_oldest - 丟棄最舊的訊息 (房間的 game_delta 因此出現 seq 缺號時，
+                    客戶端會自行要求快照)
+      disconnect  - 直接剔除該連線
+  - 單次送出超過 send_timeout 或失敗的連線會被移除並關閉
+  - 心跳：每 WS_PING_INTERVAL 秒送出 {"type": "ping"}，客戶端回 {"type": "pong"}；
+    超過 WS_PING_INTERVAL + WS_PING_TIMEOUT 秒沒有收到任何訊息的半開連線會被剔除
+
+多 worker 部署時設定 publish (cluster.py)：broadcast_* 改為把已序列化的訊息
+發佈給所有 worker，各 worker 再以 deliver_* 送給自己持有的連線。
+"""
+import asyncio
+import collections
+import json
+import os
+import time
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from fastapi import WebSocket
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用套件
+    orjson = None
+
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "2.0"))
+WS_QUEUE_MAX = int(os.environ.get("WS_QUEUE_MAX", "256"))
+WS_OVERFLOW_POLICY = os.environ.get("WS_OVERFLOW_POLICY", "drop_oldest")
+WS_PING_INTERVAL = float(os.environ.get("WS_PING_INTERVAL", "20.0"))
+WS_PING_TIMEOUT = float(os.environ.get("WS_PING_TIMEOUT", "20.0"))
+
+OVERFLOW_POLICIES = ("drop_oldest", "disconnect")
+# 客戶端的心跳回覆 (前端送出的固定字串)，收到時只更新心跳時間
+PONG_MESSAGE = '{"type":"pong"}'
+
+
+def encode_message(message: dict) -> str:
+    """將訊息序列化成 JSON 字串 (與 WebSocket.send_json 的格式相同)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(message).decode()
+        except TypeError:
+            pass
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ClientConnection:
+    """一條連線的送出佇列與 writer 工作"""
+    __slots__ = ("websocket", "room_id", "queue", "wakeup", "writer", "last_seen", "dropped")
+
+    def __init__(self, websocket: WebSocket, room_id: Optional[int]):
+        self.websocket = websocket
+        self.room_id = room_id
+        self.queue: Deque[str] = collections.deque()
+        self.wakeup = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.last_seen = time.monotonic()
+        self.dropped = 0
+
+
+class ConnectionManager:
+    def __init__(self, send_timeout: float = WS_SEND_TIMEOUT, queue_max: int = WS_QUEUE_MAX,
+                 overflow_policy: str = WS_OVERFLOW_POLICY,
+                 ping_interval: float = WS_PING_INTERVAL, ping_timeout: float = WS_PING_TIMEOUT):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"WS_OVERFLOW_POLICY must be one of {OVERFLOW_POLICIES}")
+        self.lobby_connections: List[WebSocket] = []
+        self.room_connections: Dict[int, List[WebSocket]] = {}
+        self._clients: Dict[WebSocket, ClientConnection] = {}
+        self.send_timeout = send_timeout
+        self.queue_max = queue_max
+        self.overflow_policy = overflow_policy
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.evicted = 0
+        self.evictions: Dict[str, int] = {"overflow": 0, "send_failed": 0, "heartbeat": 0}
+        self.dropped = 0
+        self.pings = 0
+        self.max_queue_depth = 0
+        # (room_id, text) -> 發佈給所有 worker；None 代表只有本程序
+        self.publish: Optional[Callable[[Optional[int], str], Awaitable[None]]] = None
+
+    async def connect(self, websocket: WebSocket, room_id: int = None):
+        await websocket.accept()
+        if room_id is None:
+            self.lobby_connections.append(websocket)
+        else:
+            if room_id not in self.room_connections:
+                self.room_connections[room_id] = []
+            self.room_connections[room_id].append(websocket)
+        client = ClientConnection(websocket, room_id)
+        client.writer = asyncio.get_running_loop().create_task(self._write(client))
+        self._clients[websocket] = client
+
+    def disconnect(self, websocket: WebSocket, room_id: int = None):
+        if room_id is None:
+            if websocket in self.lobby_connections:
+                self.lobby_connections.remove(websocket)
+        else:
+            if room_id in self.room_connections and websocket in self.room_connections[room_id]:
+                self.room_connections[room_id].remove(websocket)
+        client = self._clients.pop(websocket, None)
+        if client is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def touch(self, websocket: WebSocket):
+        """收到客戶端的任何訊息 (包含 pong) 時呼叫，更新心跳時間"""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.last_seen = time.monotonic()
+
+    async def send(self, websocket: WebSocket, message: dict):
+        """經由該連線的佇列送出單一訊息，與廣播保持先後順序"""
+        await self._enqueue([websocket], encode_message(message))
+
+    async def broadcast_lobby(self, message: dict):
+        if self.publish is not None:
+            await self.publish(None, encode_message(message))
+        else:
+            await self.deliver_lobby(encode_message(message))
+
+    async def broadcast_room(self, room_id: int, message: dict):
+        if self.publish is not None:
+            await self.publish(room_id, encode_message(message))
+        elif room_id in self.room_connections:
+            await self.deliver_room(room_id, encode_message(message))
+
+    async def deliver_lobby(self, text: str):
+        """送給本程序持有的大廳連線"""
+        await self._enqueue(list(self.lobby_connections), text)
+
+    async def deliver_room(self, room_id: int, text: str):
+        """送給本程序持有的房間連線"""
+        if room_id in self.room_connections:
+            await self._enqueue(list(self.room_connections[room_id]), text)
+
+    async def close_room(self, room_id: int):
+        """關閉房間內所有本程序持有的連線"""
+        connections = self.room_connections.pop(room_id, [])
+        for ws in connections:
+            self.disconnect(ws, room_id)
+        await asyncio.gather(*(self._close(ws) for ws in connections))
+
+    async def _enqueue(self, connections: List[WebSocket], text: str):
+        # 只放進佇列，不等待送出；跟不上的客戶端依 overflow_policy 處理
+        overflowed = []
+        for ws in connections:
+            client = self._clients.get(ws)
+            if client is None:
+                continue
+            if len(client.queue) >= self.queue_max:
+                if self.overflow_policy == "disconnect":
+                    overflowed.append(ws)
+                    continue
+                client.queue.popleft()
+                client.dropped += 1
+                self.dropped += 1
+            client.queue.append(text)
+            client.wakeup.set()
+            if len(client.queue) > self.max_queue_depth:
+                self.max_queue_depth = len(client.queue)
+        if overflowed:
+            await self._evict(overflowed, "overflow")
+
+    async def _write(self, client: ClientConnection):
+        """連線的 writer：依序送出佇列中的訊息，逾時或失敗時剔除連線"""
+        while True:
+            if not client.queue:
+                client.wakeup.clear()
+                await client.wakeup.wait()
+                continue
+            text = client.queue.popleft()
+            try:
+                await asyncio.wait_for(client.websocket.send_text(text), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not isinstance(e, asyncio.TimeoutError):
+                    print(f"WebSocket send failed: {e!r}")
+                await self._evict([client.websocket], "send_failed")
+                return
+
+    def start_heartbeat(self):
+        if self._heartbeat is None and self.ping_interval > 0:
+            self._heartbeat = asyncio.get_running_loop().create_task(self._run_heartbeat())
+
+    async def stop(self):
+        """停止心跳與所有 writer 工作，等它們結束後清空連線表 (於 shutdown 時呼叫)"""
+        tasks = [client.writer for client in self._clients.values() if client.writer is not None]
+        if self._heartbeat is not None:
+            tasks.append(self._heartbeat)
+            self._heartbeat = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._clients.clear()
+        self.lobby_connections.clear()
+        self.room_connections.clear()
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            deadline = time.monotonic() - self.ping_interval - self.ping_timeout
+            stale = [ws for ws, client in self._clients.items() if client.last_seen < deadline]
+            if stale:
+                await self._evict(stale, "heartbeat")
+            self.pings += 1
+            await self._enqueue(list(self._clients), encode_message({"type": "ping"}))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _evict(self, websockets: List[WebSocket], reason: str):
+        """移除跟不上、送出失敗或沒有心跳的連線並嘗試關閉"""
+        evicted = []
+        for ws in websockets:
+            client = self._clients.get(ws)
+            if client is None:
+                continue
+            self.disconnect(ws, client.room_id)
+            self.evicted += 1
+            self.evictions[reason] += 1
+            evicted.append(ws)
+        await asyncio.gather(*(self._close(ws) for ws in evicted))
+
+    def stats(self) -> dict:
+        depths = [len(client.queue) for client in self._clients.values()]
+        return {
+            "lobby_connections": len(self.lobby_connections),
+            "room_connections": sum(len(c) for c in self.room_connections.values()),
+            "queued_messages": sum(depths),
+            "max_queue_depth_now": max(depths, default=0),
+            "max_queue_depth_seen": self.max_queue_depth,
+            "dropped_messages": self.dropped,
+            "evicted": self.evicted,
+            "evictions": dict(self.evictions),
+            "pings": self.pings,
+            "queue_max": self.queue_max,
+            "overflow_policy": self.overflow_policy,
+            "encoder": "orjson" if orjson is not None else "json",
+        }
@@ -0,0 +1,229 @@
+"""SQLite 存取層
+
+所有資料庫操作都透過這裡的連線池進行，避免每次呼叫都重新
+sqlite3.connect()。連線在建立時就開啟 WAL 並調整 pragma，
+且會持續存活，因此 sqlite3 內建的 prepared statement 快取
+(cached_statements) 可以在不同請求之間重複使用。
+
+統計查詢則交給 ReadExecutor，在獨立的執行緒池中以唯讀連線執行，
+不會阻塞 event loop。
+"""
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+DB_PATH = os.environ.get("GAME_DB_PATH", "game_records.db")
+POOL_SIZE = int(os.environ.get("GAME_DB_POOL_SIZE", "4"))
+STATS_READ_WORKERS = int(os.environ.get("STATS_READ_WORKERS", "4"))
+STATEMENT_CACHE_SIZE = 256
+PLAYER_ID_CACHE_SIZE = int(os.environ.get("PLAYER_ID_CACHE_SIZE", "10000"))
+
+# 每條連線建立時套用的 pragma
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-16000",    # 約 16 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# 唯讀連線使用的 pragma (journal_mode 由寫入端設定)
+READ_PRAGMAS = (
+    "PRAGMA query_only=ON",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+class Database:
+    """固定大小的 SQLite 連線池"""
+
+    def __init__(self, path: str = DB_PATH, pool_size: int = POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: list = []
+        self._lock = threading.Lock()
+        self._trace_callback = None
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.set_trace_callback(self._trace_callback)
+        return conn
+
+    def set_trace_callback(self, callback):
+        """對池中現有與之後建立的連線設定 SQL trace (除錯 / 查詢計畫檢查用)"""
+        with self._lock:
+            self._trace_callback = callback
+            for conn in self._all:
+                conn.set_trace_callback(callback)
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.pool_size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+        # 連線都在使用中，等待歸還
+        return self._idle.get()
+
+    def _release(self, conn: sqlite3.Connection):
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """借出一條連線，用完自動歸還"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """借出連線並在區塊結束時 commit，發生例外則 rollback"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def close(self):
+        """關閉所有連線 (於 shutdown 時呼叫)"""
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all = []
+            self._idle = queue.LifoQueue()
+
+
+class ReadExecutor:
+    """在專用執行緒池中以唯讀連線執行查詢
+
+    每個工作執行緒持有自己的唯讀連線；max_workers 決定統計查詢的
+    最大並行數，與遊戲寫入互不影響。
+    """
+
+    def __init__(self, path: str = DB_PATH, max_workers: int = STATS_READ_WORKERS):
+        self.path = path
+        self.max_workers = max_workers
+        self._executor = None
+        self._local = threading.local()
+        self._conns: list = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = Path(self.path).absolute().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(
+                uri,
+                uri=True,
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            for pragma in READ_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _call(self, fn, args):
+        cursor = self._connection().cursor()
+        try:
+            return fn(cursor, *args)
+        finally:
+            cursor.close()
+
+    async def run(self, fn, *args):
+        """以 fn(cursor, *args) 的形式在讀取執行緒池中執行並回傳結果"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="stats-read")
+            executor = self._executor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._call, fn, args)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._conns = []
+        self._local = threading.local()
+
+
+class IdentityMap:
+    """有上限的 LRU 對照表，例如 username -> players.player_id"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+database = Database()
+read_executor = ReadExecutor()
+player_ids = IdentityMap(PLAYER_ID_CACHE_SIZE)
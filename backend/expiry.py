@@ -0,0 +1,73 @@
+"""以 min-heap 實作的到期排程
+
+每個 key 只有一個有效期限；重新排程時直接推入新項目，舊項目留在 heap 中，
+取出時再比對期限是否仍有效 (lazy invalidation)。
+背景工作只需睡到最早的期限，醒來時也只處理已到期的項目。
+"""
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class ExpiryScheduler:
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._counter = itertools.count()
+        # 新期限早於目前最早期限時呼叫，讓背景工作提早醒來
+        self.wakeup: Optional[Callable[[], None]] = None
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: Hashable, deadline: float):
+        """設定 (或更新) key 的到期時間 (time.time() 秒)"""
+        if self._deadlines.get(key) == deadline:
+            return
+        earliest = self.next_deadline()
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+        self._maybe_compact()
+        if self.wakeup is not None and (earliest is None or deadline < earliest):
+            self.wakeup()
+
+    def cancel(self, key: Hashable):
+        self._deadlines.pop(key, None)
+
+    def next_deadline(self) -> Optional[float]:
+        """最早的有效期限 (沒有排程時回傳 None)"""
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Hashable]:
+        """取出所有已到期的 key"""
+        now = time.time() if now is None else now
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        self.expired += len(due)
+        return due
+
+    def _maybe_compact(self):
+        # 失效項目過多時重建 heap，避免頻繁更新期限造成 heap 無限成長
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, next(self._counter), k) for k, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "expired": self.expired,
+        }
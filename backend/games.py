@@ -0,0 +1,141 @@
+"""遊戲生命週期管理
+
+進行中的遊戲保存完整的 GameState；遊戲結束後立即轉成精簡的封存摘要
+(最終狀態，不含 AI 物件與行動記錄，行動記錄已寫入資料庫)，
+封存區依數量與估計位元組數的上限做 LRU 淘汰。
+進行中的遊戲也有數量上限，超過時淘汰最久未存取的遊戲 (通常是被放棄的遊戲)。
+"""
+import os
+import random
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from connections import encode_message
+
+ACTIVE_GAMES_MAX = int(os.environ.get("ACTIVE_GAMES_MAX", "5000"))
+ARCHIVED_GAMES_MAX = int(os.environ.get("ARCHIVED_GAMES_MAX", "10000"))
+ARCHIVE_MAX_BYTES = int(os.environ.get("ARCHIVE_MAX_BYTES", str(16 * 1024 * 1024)))
+# stats() 估計進行中遊戲的記憶體時抽樣的遊戲數 (遞迴估計每場遊戲的成本不低)
+ACTIVE_SIZE_SAMPLE = int(os.environ.get("ACTIVE_SIZE_SAMPLE", "32"))
+
+GameState = Any  # main.GameState (避免循環 import)
+
+
+def approx_size(obj, _seen=None) -> int:
+    """遞迴估計物件佔用的記憶體 (位元組)"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v, _seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), _seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(approx_size(getattr(obj, name), _seen)
+                    for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+class GameRegistry:
+    def __init__(self, active_max: int = ACTIVE_GAMES_MAX,
+                 archived_max: int = ARCHIVED_GAMES_MAX,
+                 archive_max_bytes: int = ARCHIVE_MAX_BYTES):
+        self.active_max = active_max
+        self.archived_max = archived_max
+        self.archive_max_bytes = archive_max_bytes
+        self._active: "OrderedDict[str, GameState]" = OrderedDict()
+        self._archived: "OrderedDict[str, dict]" = OrderedDict()
+        self._archived_sizes: Dict[str, int] = {}
+        self._archived_bytes = 0
+        # 進行中的遊戲因超過上限被淘汰時呼叫 (例如重設房間狀態)
+        self.on_evict: Optional[Callable[[str, GameState], None]] = None
+        self.evicted_active = 0
+        self.evicted_archived = 0
+
+    # ----- 進行中的遊戲 (dict 相容介面) -----
+    def __contains__(self, game_id) -> bool:
+        return game_id in self._active
+
+    def __getitem__(self, game_id: str) -> GameState:
+        game = self.get(game_id)
+        if game is None:
+            raise KeyError(game_id)
+        return game
+
+    def __setitem__(self, game_id: str, game: GameState):
+        self._active[game_id] = game
+        self._active.move_to_end(game_id)
+        while len(self._active) > self.active_max:
+            evicted_id, evicted = self._active.popitem(last=False)
+            self.evicted_active += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted_id, evicted)
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def get(self, game_id: str, default=None) -> Optional[GameState]:
+        game = self._active.get(game_id)
+        if game is None:
+            return default
+        self._active.move_to_end(game_id)
+        return game
+
+    def pop(self, game_id: str, default=None):
+        """從進行中與封存區移除"""
+        self._drop_archived(game_id)
+        return self._active.pop(game_id, default)
+
+    # ----- 封存 -----
+    def archive(self, game_id: str, summary: dict):
+        """遊戲結束：以精簡摘要取代完整的 GameState"""
+        self._active.pop(game_id, None)
+        self._drop_archived(game_id)
+        size = len(encode_message(summary)) + sys.getsizeof(summary)
+        self._archived[game_id] = summary
+        self._archived_sizes[game_id] = size
+        self._archived_bytes += size
+        while self._archived and (len(self._archived) > self.archived_max
+                                  or self._archived_bytes > self.archive_max_bytes):
+            oldest = next(iter(self._archived))
+            self._drop_archived(oldest)
+            self.evicted_archived += 1
+
+    def get_archived(self, game_id: str) -> Optional[dict]:
+        summary = self._archived.get(game_id)
+        if summary is not None:
+            self._archived.move_to_end(game_id)
+        return summary
+
+    def _drop_archived(self, game_id: str):
+        if self._archived.pop(game_id, None) is not None:
+            self._archived_bytes -= self._archived_sizes.pop(game_id)
+
+    def _active_approx_bytes(self) -> int:
+        """抽樣最多 ACTIVE_SIZE_SAMPLE 場遊戲估計平均大小，再乘上進行中的遊戲數"""
+        if not self._active:
+            return 0
+        games = list(self._active.values())
+        sample = random.sample(games, min(ACTIVE_SIZE_SAMPLE, len(games)))
+        return sum(approx_size(g) for g in sample) * len(games) // len(sample)
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._active),
+            "active_approx_bytes": self._active_approx_bytes(),
+            "archived": len(self._archived),
+            "archived_approx_bytes": self._archived_bytes,
+            "evicted_active": self.evicted_active,
+            "evicted_archived": self.evicted_archived,
+            "limits": {
+                "active_max": self.active_max,
+                "archived_max": self.archived_max,
+                "archive_max_bytes": self.archive_max_bytes,
+            },
+        }
@@ -0,0 +1,180 @@
+"""回合提示表
+
+提示規則以 @hint_rule 宣告式註冊，每條規則是 (號碼, 玩家人數) -> bool 的判斷式。
+第一次查詢時對 1-MAX_NUMBER 的每個號碼、2-MAX_PLAYERS 的每種人數預先算好
+(之後有新規則註冊時，下一次查詢會重新計算)：
+  - 每個號碼成立的提示文字
+  - 每條規則成立的號碼 (board.py 位元遮罩)
+開局只需查表並隨機選一個提示；也能直接算出每個提示在某個範圍內
+排除了多少候選號碼，用來平衡提示強度，不需要任何執行期計算。
+"""
+import random
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import board
+
+MAX_NUMBER = 30
+MAX_PLAYERS = 10
+HINTS_PER_ROUND = 1
+
+Label = Union[str, Callable[[int], str]]
+
+
+class HintRule(NamedTuple):
+    key: str
+    predicate: Callable[[int, int], bool]
+    label: Label
+
+    def text(self, player_count: int) -> str:
+        return self.label(player_count) if callable(self.label) else self.label
+
+
+HINT_RULES: List[HintRule] = []
+
+
+def hint_rule(key: str, label: Optional[Label] = None):
+    """註冊提示規則；label 可為固定文字或 (玩家人數) -> 文字"""
+    def register(predicate: Callable[[int, int], bool]):
+        HINT_RULES.append(HintRule(key, predicate, label or key))
+        return predicate
+    return register
+
+
+def is_prime(n: int) -> bool:
+    """判斷是否為質數"""
+    if n < 2:
+        return False
+    if n == 2:
+        return True
+    if n % 2 == 0:
+        return False
+    for i in range(3, int(n ** 0.5) + 1, 2):
+        if n % i == 0:
+            return False
+    return True
+
+
+# ===== 提示規則 =====
+@hint_rule("2的倍數")
+def _multiple_of_2(n, player_count):
+    return n % 2 == 0
+
+
+@hint_rule("3的倍數")
+def _multiple_of_3(n, player_count):
+    return n % 3 == 0
+
+
+@hint_rule("5的倍數")
+def _multiple_of_5(n, player_count):
+    return n % 5 == 0
+
+
+@hint_rule("7的倍數")
+def _multiple_of_7(n, player_count):
+    return n % 7 == 0
+
+
+@hint_rule("質數")
+def _prime(n, player_count):
+    return is_prime(n)
+
+
+@hint_rule("數字含有1或2")
+def _contains_1_or_2(n, player_count):
+    return '1' in str(n) or '2' in str(n)
+
+
+@hint_rule("2跟3的公倍數")
+def _multiple_of_6(n, player_count):
+    return n % 6 == 0
+
+
+@hint_rule("爆掉數字+1為4的倍數")
+def _plus_one_multiple_of_4(n, player_count):
+    return (n + 1) % 4 == 0
+
+
+@hint_rule("15以內的數字")
+def _at_most_15(n, player_count):
+    return n <= 15
+
+
+@hint_rule("玩家人數+1的倍數", lambda pc: f"玩家人數+1的倍數({pc + 1}的倍數)")
+def _multiple_of_players_plus_1(n, player_count):
+    return player_count > 1 and n % (player_count + 1) == 0
+
+
+# 與「玩家人數+1的倍數」互斥，兩者都成立時只給 +1
+@hint_rule("玩家人數-1的倍數", lambda pc: f"玩家人數-1的倍數({pc - 1}的倍數)")
+def _multiple_of_players_minus_1(n, player_count):
+    return (player_count > 2 and n % (player_count + 1) != 0
+            and n % (player_count - 1) == 0)
+
+
+class HintTables:
+    def __init__(self, rules: List[HintRule] = HINT_RULES,
+                 max_number: int = MAX_NUMBER, max_players: int = MAX_PLAYERS):
+        # 直接引用規則串列 (不複製)，之後以 @hint_rule 註冊的規則也會生效
+        self.rules = rules
+        self.max_number = max_number
+        self.max_players = max_players
+        # 建表時的規則數；規則只會增加，數量不同代表表格已過期
+        self._built_for = -1
+        # (player_count, number) -> 成立的提示文字
+        self._labels: Dict[Tuple[int, int], Tuple[str, ...]] = {}
+        # (player_count, rule index) -> 成立的號碼遮罩
+        self._matches: Dict[Tuple[int, int], int] = {}
+
+    def _ensure_built(self):
+        if self._built_for == len(self.rules):
+            return
+        rules = list(self.rules)
+        labels, all_matches = {}, {}
+        for player_count in range(2, self.max_players + 1):
+            matches = [0] * len(rules)
+            for n in range(1, self.max_number + 1):
+                matched = []
+                for i, rule in enumerate(rules):
+                    if rule.predicate(n, player_count):
+                        matches[i] |= 1 << n
+                        matched.append(rule.text(player_count))
+                labels[player_count, n] = tuple(matched)
+            for i, mask in enumerate(matches):
+                all_matches[player_count, i] = mask
+        self._labels, self._matches = labels, all_matches
+        self._built_for = len(rules)
+
+    def candidates(self, number: int, player_count: int) -> Tuple[str, ...]:
+        """號碼成立的所有提示"""
+        self._ensure_built()
+        labels = self._labels.get((player_count, number))
+        if labels is None:
+            # 超出預先計算的範圍時直接套用規則
+            labels = tuple(rule.text(player_count) for rule in self.rules
+                           if rule.predicate(number, player_count))
+        return labels
+
+    def pick(self, number: int, player_count: int, k: int = HINTS_PER_ROUND) -> List[str]:
+        """隨機選出本回合的提示"""
+        labels = self.candidates(number, player_count)
+        return random.sample(labels, min(k, len(labels)))
+
+    def eliminated(self, rule_index: int, player_count: int, lower: int, upper: int) -> int:
+        """提示成立時，範圍內被排除 (不符合提示) 的候選號碼數"""
+        self._ensure_built()
+        in_range = board.range_mask(lower, upper)
+        return board.count(in_range & ~self._matches[player_count, rule_index])
+
+    def elimination_report(self, lower: int, upper: int, player_count: int) -> Dict[str, int]:
+        """範圍內每個提示排除的候選號碼數 (只列出範圍內會出現的提示)"""
+        self._ensure_built()
+        in_range = board.range_mask(lower, upper)
+        return {
+            rule.text(player_count): self.eliminated(i, player_count, lower, upper)
+            for i, rule in enumerate(self.rules)
+            if self._matches[player_count, i] & in_range
+        }
+
+
+hint_tables = HintTables()
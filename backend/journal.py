@@ -0,0 +1,210 @@
+"""行動記錄的 write-behind 寫入器
+
+遊戲中的每個行動只需放進佇列即可返回，實際的 INSERT 由背景執行緒
+累積成批次 (數量或時間門檻) 後以單一交易寫入，遊戲熱路徑不必等待磁碟。
+
+寫入失敗時 (例如資料庫暫時被鎖住) 以指數退避重試 JOURNAL_RETRIES 次；
+仍然失敗的資料列保留下來，併入下一批 (或每 JOURNAL_RETRY_INTERVAL_MS) 再寫，
+最多保留 JOURNAL_MAX_PENDING 列，超過上限或停止時仍無法寫入的資料列才會丟棄。
+失敗、重試與丟棄的數量都列在 stats()。
+"""
+import os
+import queue
+import threading
+import time
+
+from db import Database, database
+
+JOURNAL_BATCH_SIZE = int(os.environ.get("JOURNAL_BATCH_SIZE", "200"))
+JOURNAL_FLUSH_INTERVAL_MS = int(os.environ.get("JOURNAL_FLUSH_INTERVAL_MS", "50"))
+JOURNAL_RETRIES = int(os.environ.get("JOURNAL_RETRIES", "3"))
+JOURNAL_RETRY_BACKOFF_MS = int(os.environ.get("JOURNAL_RETRY_BACKOFF_MS", "50"))
+JOURNAL_RETRY_INTERVAL_MS = int(os.environ.get("JOURNAL_RETRY_INTERVAL_MS", "1000"))
+JOURNAL_MAX_PENDING = int(os.environ.get("JOURNAL_MAX_PENDING", "100000"))
+
+INSERT_ACTION_SQL = '''
+    INSERT INTO actions
+    (game_uuid, round_number, player_id, action_type,
+     numbers_called, hit_secret, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+_STOP = object()
+
+
+class ActionJournal:
+    """以背景執行緒批次寫入 actions 表"""
+
+    def __init__(self, db: Database, batch_size: int = JOURNAL_BATCH_SIZE,
+                 flush_interval_ms: int = JOURNAL_FLUSH_INTERVAL_MS,
+                 retries: int = JOURNAL_RETRIES, retry_backoff_ms: int = JOURNAL_RETRY_BACKOFF_MS,
+                 retry_interval_ms: int = JOURNAL_RETRY_INTERVAL_MS,
+                 max_pending: int = JOURNAL_MAX_PENDING):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.retries = retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.retry_interval = retry_interval_ms / 1000
+        self.max_pending = max_pending
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # 重試後仍寫入失敗、等待下一次寫入的資料列 (只有背景執行緒存取)
+        self._pending: list = []
+
+        # metrics
+        self.rows_written = 0
+        self.batches_written = 0
+        self.errors = 0
+        self.retried = 0
+        self.failed_batches = 0
+        self.rows_dropped = 0
+        self.last_error = None
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="action-journal", daemon=True)
+                self._thread.start()
+
+    def append(self, row: tuple):
+        """加入一筆 actions 資料列 (欄位順序同 INSERT_ACTION_SQL)"""
+        self._ensure_started()
+        self._queue.put(row)
+
+    def flush(self, wait: bool = False, timeout: float = None) -> bool:
+        """要求立即寫入目前佇列中的資料；wait=True 時等到寫入完成"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout) if wait else True
+
+    def stop(self, timeout: float = 5.0):
+        """寫完剩餘資料並停止背景執行緒 (於 shutdown 時呼叫)"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "rows_written": self.rows_written,
+            "batches_written": self.batches_written,
+            "errors": self.errors,
+            "retried": self.retried,
+            "failed_batches": self.failed_batches,
+            "rows_pending": len(self._pending),
+            "rows_dropped": self.rows_dropped,
+            "last_error": self.last_error,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches_written, 3)
+                            if self.batches_written else 0.0,
+        }
+
+    def _run(self):
+        while True:
+            try:
+                # 有待重寫的資料列時定期醒來，即使沒有新的行動也會重試
+                item = self._queue.get(timeout=self.retry_interval if self._pending else None)
+            except queue.Empty:
+                self._write([])
+                continue
+            batch = []
+            waiters = []
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+
+            # 收集到數量門檻、時間門檻或收到 flush/stop 為止
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # 把停止前已排入的資料一併寫完
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+
+            if batch or self._pending:
+                self._write(batch)
+            if stopping and self._pending:
+                self.rows_dropped += len(self._pending)
+                print(f"[Journal] dropped {len(self._pending)} actions that could not be written "
+                      f"before shutdown: {self.last_error}")
+                self._pending = []
+            for waiter in waiters:
+                waiter.set()
+            if stopping:
+                return
+
+    def _write(self, batch: list):
+        """寫入 (先前失敗的資料列 + batch)，失敗時退避重試，仍失敗則保留到下一次"""
+        if self._pending:
+            batch = self._pending + batch
+            self._pending = []
+        for attempt in range(self.retries + 1):
+            t0 = time.perf_counter()
+            try:
+                with self.db.transaction() as c:
+                    c.executemany(INSERT_ACTION_SQL, batch)
+                break
+            except Exception as e:
+                self.errors += 1
+                self.last_error = repr(e)
+                if attempt < self.retries:
+                    self.retried += 1
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+        else:
+            self._retain(batch)
+            return
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        self.rows_written += len(batch)
+        self.batches_written += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def _retain(self, batch: list):
+        """重試用盡：保留資料列等待下一次寫入，超過 max_pending 時丟棄最舊的"""
+        self.failed_batches += 1
+        keep = batch[-self.max_pending:] if self.max_pending > 0 else []
+        dropped = len(batch) - len(keep)
+        self._pending = keep
+        self.rows_dropped += dropped
+        print(f"[Journal] failed to write {len(batch)} actions after {self.retries + 1} attempts "
+              f"({self.last_error}); keeping {len(keep)} for the next write"
+              + (f", dropped {dropped}" if dropped else ""))
+
+
+action_journal = ActionJournal(database)
@@ -0,0 +1,93 @@
+"""記憶體內排行榜
+
+啟動時從 players 表重建一次，之後每場遊戲結束時只調整有參與的玩家，
+查詢時直接依序切片，不必每次對整張 players 表排序。
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+def _win_rate(wins: int, games: int) -> float:
+    # 與 SQL 的 ROUND(CAST(total_wins AS FLOAT) / total_games * 100, 2) 一致
+    return round(wins / games * 100, 2) if games else 0.0
+
+
+class Leaderboard:
+    """依 (win_rate DESC, total_wins DESC, username) 排序的排行榜"""
+
+    def __init__(self):
+        self._players: Dict[str, dict] = {}
+        # 排序用的 key 串列，元素為 (-win_rate, -total_wins, username)
+        self._order: List[Tuple[float, int, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._order)
+
+    @staticmethod
+    def _key(entry: dict) -> Tuple[float, int, str]:
+        return (-entry["win_rate"], -entry["total_wins"], entry["username"])
+
+    def load(self, rows):
+        """以 (username, nickname, total_games, total_wins, total_losses,
+        win_rate, is_ai) 資料列重建整個排行榜"""
+        players = {}
+        for username, nickname, games, wins, losses, win_rate, is_ai in rows:
+            players[username] = {
+                "username": username,
+                "nickname": nickname,
+                "total_games": games,
+                "total_wins": wins,
+                "total_losses": losses,
+                "win_rate": float(win_rate or 0),
+                "is_ai": bool(is_ai),
+            }
+        order = sorted(self._key(e) for e in players.values() if e["total_games"] > 0)
+        with self._lock:
+            self._players = players
+            self._order = order
+
+    def record_result(self, username: str, nickname: Optional[str],
+                      is_ai: bool, won: bool):
+        """一場遊戲結束後更新單一玩家的戰績"""
+        with self._lock:
+            entry = self._players.get(username)
+            if entry is None:
+                entry = {
+                    "username": username,
+                    "nickname": nickname,
+                    "total_games": 0,
+                    "total_wins": 0,
+                    "total_losses": 0,
+                    "win_rate": 0.0,
+                    "is_ai": bool(is_ai),
+                }
+                self._players[username] = entry
+            elif entry["total_games"] > 0:
+                old_key = self._key(entry)
+                i = bisect.bisect_left(self._order, old_key)
+                if i < len(self._order) and self._order[i] == old_key:
+                    del self._order[i]
+
+            entry["total_games"] += 1
+            if won:
+                entry["total_wins"] += 1
+            else:
+                entry["total_losses"] += 1
+            entry["win_rate"] = _win_rate(entry["total_wins"], entry["total_games"])
+            bisect.insort(self._order, self._key(entry))
+
+    def page(self, offset: int = 0, limit: int = 10) -> List[dict]:
+        """取得排行榜的一頁，rank 從 offset + 1 起算"""
+        offset = max(offset, 0)
+        limit = max(limit, 0)
+        with self._lock:
+            keys = self._order[offset:offset + limit]
+            return [
+                {"rank": offset + i + 1, **self._players[key[2]]}
+                for i, key in enumerate(keys)
+            ]
+
+
+leaderboard = Leaderboard()
@@ -1,15 +1,31 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
+import os
 import random
-import uuid
-import sqlite3
+import time
+import re
 import json
-from datetime import datetime
+import zlib
+from datetime import datetime, timezone
 from enum import Enum
 import asyncio
-import traceback
+
+from connections import PONG_MESSAGE, ConnectionManager, encode_message
+from db import database, player_ids, read_executor
+from journal import action_journal
+from leaderboard import leaderboard
+from migrations import apply_migrations
+from expiry import ExpiryScheduler
+from rooms import RoomRegistry, encode_cursor
+from games import GameRegistry
+from ai_scheduler import AITurnScheduler
+from actors import GameActors
+from cluster import FORWARDED_HEADER, ClusterUnavailable, call_asgi, create_cluster
+import board
+from hints import hint_tables
+from strategy import PASS_BIT, REVERSE_BIT, decode_action, stage_of, strategy_tables
 
 app = FastAPI(title="終極密碼遊戲 API v2")
 
@@ -21,6 +37,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
@@ -34,72 +51,9 @@ async def validation_exception_handler(request, exc):
 
 # ===== 資料庫初始化 =====
 def init_db():
-    conn = sqlite3.connect('game_records.db')
-    c = conn.cursor()
-    
-    # 玩家表
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS players (
-            player_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            nickname VARCHAR(50),
-            is_ai BOOLEAN DEFAULT FALSE,
-            ai_difficulty VARCHAR(20),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            total_games INTEGER DEFAULT 0,
-            total_wins INTEGER DEFAULT 0,
-            total_losses INTEGER DEFAULT 0,
-            win_rate DECIMAL(5,2) DEFAULT 0.00
-        )
-    ''')
-    
-    # 遊戲記錄表
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS games (
-            game_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_uuid VARCHAR(36) UNIQUE NOT NULL,
-            start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            end_time TIMESTAMP,
-            total_rounds INTEGER,
-            winner_id INTEGER,
-            game_duration INTEGER,
-            FOREIGN KEY (winner_id) REFERENCES players(player_id)
-        )
-    ''')
-    
-    # 遊戲參與者表
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS game_participants (
-            participant_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_id INTEGER NOT NULL,
-            player_id INTEGER NOT NULL,
-            player_order INTEGER,
-            final_rank INTEGER,
-            eliminated_round INTEGER,
-            total_calls INTEGER DEFAULT 0,
-            pass_used INTEGER DEFAULT 0,
-            reverse_used INTEGER DEFAULT 0,
-            FOREIGN KEY (game_id) REFERENCES games(game_id),
-            FOREIGN KEY (player_id) REFERENCES players(player_id)
-        )
-    ''')
-    
-    # 行動記錄表
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS actions (
-            action_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_uuid VARCHAR(36) NOT NULL,
-            round_number INTEGER NOT NULL,
-            player_id INTEGER NOT NULL,
-            action_type VARCHAR(20) NOT NULL,
-            numbers_called TEXT,
-            hit_secret BOOLEAN DEFAULT FALSE,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    """依 migrations.py 將資料庫升級到最新 schema"""
+    with database.connection() as conn:
+        apply_migrations(conn)
 
 init_db()
 
@@ -114,9 +68,40 @@ class AIPlayer:
         self.player_id = player_id
         self.difficulty = difficulty
     
-    def decide_action(self, game_state, available_numbers, 
+    def decide_action(self, game_state, available_mask: int, 
                      pass_available, reverse_available):
-        """AI 決策"""
+        """AI 決策：依難度查詢策略表 (strategy.py)，查不到時使用簡單策略"""
+        lower, upper = game_state['number_range']
+        flags = self._turn_flags(game_state)
+        action = strategy_tables.choose(
+            self.difficulty, upper - lower + 1, flags, game_state['direction'] < 0,
+            stage_of(game_state.get('current_round', 1))) if flags else None
+        if action is not None:
+            decision = decode_action(action, lower)
+            if (decision['action'] != 'call'
+                    or board.mask_of(decision['numbers']) & ~available_mask == 0):
+                return decision
+        return self._simple_action(game_state, available_mask, pass_available)
+
+    def _turn_flags(self, game_state):
+        """存活玩家依出手順序 (自己在前) 的 Pass / 迴轉可用旗標"""
+        if 'direction' not in game_state:
+            return None
+        alive, start = [], None
+        for p in game_state['players']:
+            if p['is_alive']:
+                if p['id'] == self.player_id:
+                    start = len(alive)
+                alive.append((PASS_BIT if p['pass_available'] else 0)
+                             | (REVERSE_BIT if p['reverse_available'] else 0))
+        if start is None:
+            return None
+        if game_state['direction'] < 0:
+            return tuple(alive[start::-1] + alive[:start:-1])
+        return tuple(alive[start:] + alive[:start])
+
+    def _simple_action(self, game_state, available_mask: int, pass_available):
+        """策略表沒有對應狀態時的備用策略"""
         danger = len(game_state['called_numbers']) / \
                  (game_state['number_range'][1] - game_state['number_range'][0] + 1)
         
@@ -125,18 +110,18 @@ class AIPlayer:
             return {'action': 'pass'}
         
         # 選擇號碼
-        available_list = sorted(list(available_numbers))
-        if not available_list:
+        available_count = board.count(available_mask)
+        if not available_count:
             return {'action': 'pass'} if pass_available else None
         
         # 找連續號碼
-        count = random.randint(1, min(3, len(available_list)))
-        for i in range(len(available_list) - count + 1):
-            group = available_list[i:i+count]
-            if all(group[j+1] - group[j] == 1 for j in range(len(group)-1)):
-                return {'action': 'call', 'numbers': group}
+        count = random.randint(1, min(3, available_count))
+        start = board.first_run(available_mask, count)
+        if start is not None:
+            return {'action': 'call', 'numbers': list(range(start, start + count))}
         
-        return {'action': 'call', 'numbers': [available_list[0]]}
+        lowest = available_mask & -available_mask
+        return {'action': 'call', 'numbers': [lowest.bit_length() - 1]}
 
 # ===== 資料模型 =====
 class Player(BaseModel):
@@ -148,13 +133,52 @@ class Player(BaseModel):
     reverse_available: bool = True
     uuid: Optional[str] = None
 
+class GamePlayer:
+    """遊戲進行中的玩家 (熱路徑用)
+
+    每一步都會修改 is_alive / pass_available / reverse_available，
+    並在每次狀態查詢與廣播時序列化；以 __slots__ 取代 pydantic 模型，
+    屬性存取與 to_dict() 都不經過驗證。API 回應的欄位與 Player 相同。
+    """
+    __slots__ = ("id", "name", "is_ai", "is_alive", "pass_available",
+                 "reverse_available", "uuid")
+
+    def __init__(self, id: int, name: str, is_ai: bool = False,
+                 uuid: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.is_ai = is_ai
+        self.is_alive = True
+        self.pass_available = True
+        self.reverse_available = True
+        self.uuid = uuid
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "is_ai": self.is_ai,
+            "is_alive": self.is_alive,
+            "pass_available": self.pass_available,
+            "reverse_available": self.reverse_available,
+            "uuid": self.uuid,
+        }
+
 class RoomStatus(str, Enum):
     WAITING = "waiting"
     PLAYING = "playing"
     FULL = "full"
 
 class Room:
+    # 會出現在 to_dict() 的欄位；重新指定時自動遞增 version
+    _VERSIONED_FIELDS = {"name", "players", "status", "game_id",
+                         "max_players", "password", "host_id", "last_activity"}
+
     def __init__(self, room_id: int):
+        self.version = 0
+        self._on_change = None  # 由 RoomRegistry 設定
+        self._dict_cache = None
+        self._dict_cache_version = -1
         self.room_id = room_id
         self.name = self._generate_random_name()
         self.players: List[Player] = []
@@ -166,6 +190,17 @@ class Room:
         self.password: Optional[str] = None
         self.host_id: Optional[int] = None
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._VERSIONED_FIELDS:
+            self.touch()
+
+    def touch(self):
+        """房間內容有變動：遞增版本並通知註冊表"""
+        self.version += 1
+        if self._on_change is not None:
+            self._on_change(self)
+
     def _generate_random_name(self):
         adjectives = ["快樂的", "勇敢的", "神秘的", "幸運的", "瘋狂的", "超級", "無敵", "閃亮", "傳奇", "終極"]
         nouns = ["老虎", "獅子", "老鷹", "鯊魚", "熊貓", "巨龍", "鳳凰", "戰士", "法師", "獵人"]
@@ -186,6 +221,7 @@ class Room:
              pass
 
         self.players.append(player)
+        self.touch()
         if len(self.players) >= self.max_players:
             self.status = RoomStatus.FULL
             
@@ -198,29 +234,52 @@ class Room:
             if self.status == RoomStatus.FULL and len(self.players) < self.max_players:
                 self.status = RoomStatus.WAITING
 
+    def is_joinable(self) -> bool:
+        """大廳可直接加入：等待中、無密碼且還有空位"""
+        return (self.status == RoomStatus.WAITING and not self.password
+                and len(self.players) < self.max_players)
+
     def to_dict(self):
-        return {
-            "room_id": self.room_id,
-            "name": self.name,
-            "status": self.status,
-            "player_count": len(self.players),
-            "max_players": self.max_players,
-            "has_password": bool(self.password),
-            "host_id": self.host_id,
-            "players": [p.dict() for p in self.players],
-            "game_id": self.game_id
-        }
+        # 以 version 為 key 快取序列化結果，房間沒變動時直接重用
+        if self._dict_cache_version != self.version:
+            self._dict_cache = {
+                "room_id": self.room_id,
+                "name": self.name,
+                "status": self.status,
+                "player_count": len(self.players),
+                "max_players": self.max_players,
+                "has_password": bool(self.password),
+                "host_id": self.host_id,
+                "players": [p.dict() for p in self.players],
+                "game_id": self.game_id,
+                "last_activity": self.last_activity.isoformat(),
+            }
+            self._dict_cache_version = self.version
+        return self._dict_cache
+
+class GameRuleError(Exception):
+    """違反遊戲規則的行動 (訊息直接回傳給玩家)"""
 
 class GameState:
+    # 固定屬性：減少每場遊戲的記憶體並加快熱路徑上的屬性存取
+    __slots__ = ("game_id", "players", "ai_manager", "current_round",
+                 "current_player_index", "direction", "called_mask",
+                 "secret_number", "number_range", "start_time", "action_history",
+                 "hints", "game_db_id", "player_db_ids", "seq", "_published",
+                 "_published_actions")
+    # 是否輸出每回合的密碼與提示 (批次模擬時關閉)
+    verbose = True
+
     def __init__(self, players: List[dict]):
-        self.game_id = str(uuid.uuid4())
+        # 多 worker 部署時挑選由本 worker 擁有的 id (cluster.py)
+        self.game_id = cluster.local_uuid()
         self.players = []
         self.ai_manager = {}
         
         for i, p in enumerate(players):
             # Use provided ID or fallback to index
             p_id = p.get('id', i)
-            self.players.append(Player(
+            self.players.append(GamePlayer(
                 id=p_id, 
                 name=p['name'],
                 is_ai=p.get('is_ai', False)
@@ -233,73 +292,76 @@ class GameState:
         self.current_round = 1
         self.current_player_index = 0
         self.direction = 1
-        self.called_numbers = set()
+        self.called_mask = 0  # 已喊過的號碼 (board.py 位元遮罩)
         self.secret_number = None
         self.number_range = (1, 30)
         self.start_time = datetime.now()
         self.action_history = []
         self.hints = []  # 新增提示列表
+        # 資料庫主鍵，由 _save_game_to_db 解析後快取，遊戲結束時直接使用
+        self.game_db_id: Optional[int] = None
+        self.player_db_ids: dict[int, int] = {}
         
         self._start_round()
         self._save_game_to_db()
+        
+        # 差異廣播：seq 每發佈一次 delta 遞增；_published 為最後一次發佈的狀態
+        self.seq = 0
+        self._published = self._public_fields()
+        self._published_actions = 0
     
     def _save_game_to_db(self):
         """保存遊戲到資料庫"""
-        conn = sqlite3.connect('game_records.db')
-        c = conn.cursor()
-        
-        # 確保玩家存在
-        for player in self.players:
+        resolved = {}
+        with database.transaction() as c:
+            # 確保玩家存在；已知的 username 直接取快取，其餘以 RETURNING 一次取得主鍵
+            for player in self.players:
+                username = f"player_{player.id}"
+                player_db_id = player_ids.get(username)
+                if player_db_id is None:
+                    c.execute('''
+                        INSERT INTO players (username, nickname, is_ai)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(username) DO UPDATE SET username = excluded.username
+                        RETURNING player_id
+                    ''', (username, player.name, player.is_ai))
+                    player_db_id = c.fetchone()[0]
+                    resolved[username] = player_db_id
+                self.player_db_ids[player.id] = player_db_id
+            
+            # 創建遊戲記錄
             c.execute('''
-                INSERT OR IGNORE INTO players (username, nickname, is_ai)
+                INSERT INTO games (game_uuid, start_time, total_rounds)
                 VALUES (?, ?, ?)
-            ''', (f"player_{player.id}", player.name, player.is_ai))
-        
-        # 創建遊戲記錄
-        c.execute('''
-            INSERT INTO games (game_uuid, start_time, total_rounds)
-            VALUES (?, ?, ?)
-        ''', (self.game_id, self.start_time, 0))
-        
-        game_db_id = c.lastrowid
-        
-        # 創建參與者記錄
-        for i, player in enumerate(self.players):
-            c.execute('SELECT player_id FROM players WHERE username = ?',
-                     (f"player_{player.id}",))
-            player_db_id = c.fetchone()[0]
+            ''', (self.game_id, self.start_time, 0))
             
-            c.execute('''
+            self.game_db_id = c.lastrowid
+            
+            # 創建參與者記錄
+            c.executemany('''
                 INSERT INTO game_participants 
                 (game_id, player_id, player_order)
                 VALUES (?, ?, ?)
-            ''', (game_db_id, player_db_id, i))
+            ''', [(self.game_db_id, self.player_db_ids[player.id], i)
+                  for i, player in enumerate(self.players)])
         
-        conn.commit()
-        conn.close()
+        # commit 成功後才放入快取，避免 rollback 留下無效的主鍵
+        for username, player_db_id in resolved.items():
+            player_ids.put(username, player_db_id)
     
     def _save_action(self, player_id: int, action_type: str, 
                     numbers: List[int] = None, hit_secret: bool = False):
-        """保存行動記錄"""
-        conn = sqlite3.connect('game_records.db')
-        c = conn.cursor()
-        
-        c.execute('''
-            INSERT INTO actions 
-            (game_uuid, round_number, player_id, action_type, 
-             numbers_called, hit_secret)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
+        """保存行動記錄 (交給背景寫入器批次寫入，不等待磁碟)"""
+        action_journal.append((
             self.game_id, 
             self.current_round, 
             player_id,
             action_type,
             json.dumps(numbers) if numbers else None,
-            hit_secret
+            hit_secret,
+            datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
         ))
         
-        conn.commit()
-        conn.close()
         # Append to in-memory action history for quick access and broadcasts
         try:
             entry = {
@@ -314,127 +376,69 @@ class GameState:
             print(f"Failed to append action to history: {e}")
     
     def _update_game_end(self, winner_id: int):
-        """更新遊戲結束資訊"""
-        conn = sqlite3.connect('game_records.db')
-        c = conn.cursor()
-        
+        """更新遊戲結束資訊
+
+        使用快取的資料庫主鍵，不論人數多寡都只執行三條 SQL。
+        """
         end_time = datetime.now()
         duration = int((end_time - self.start_time).total_seconds())
         
-        # 更新遊戲記錄
-        c.execute('''
-            UPDATE games 
-            SET end_time = ?, total_rounds = ?, 
-                winner_id = (SELECT player_id FROM players WHERE username = ?),
-                game_duration = ?
-            WHERE game_uuid = ?
-        ''', (end_time, self.current_round, f"player_{winner_id}", 
-              duration, self.game_id))
-        
-        # 更新參與者排名
-        for i, player in enumerate(self.players):
+        # 排名：存活者第 1，淘汰者皆為淘汰人數 (與原本規則相同)
+        eliminated_count = sum(1 for p in self.players if not p.is_alive)
+        results = []
+        for player in self.players:
             if player.is_alive:
-                rank = 1
-                eliminated_round = None
+                rank, eliminated_round = 1, None
             else:
-                rank = len([p for p in self.players if not p.is_alive])
-                eliminated_round = self.current_round
-            
-            c.execute('''
-                UPDATE game_participants
-                SET final_rank = ?, eliminated_round = ?
-                WHERE game_id = (SELECT game_id FROM games WHERE game_uuid = ?)
-                  AND player_id = (SELECT player_id FROM players WHERE username = ?)
-            ''', (rank, eliminated_round, self.game_id, f"player_{player.id}"))
+                rank, eliminated_round = eliminated_count, self.current_round
+            won = 1 if player.id == winner_id else 0
+            results.append((self.player_db_ids[player.id], rank, eliminated_round, won))
         
-        # 更新玩家統計
-        for player in self.players:
-            is_winner = player.id == winner_id
+        values = ", ".join(["(?, ?, ?, ?)"] * len(results))
+        params = [v for row in results for v in row]
+        
+        with database.transaction() as c:
+            # 更新遊戲記錄
             c.execute('''
+                UPDATE games 
+                SET end_time = ?, total_rounds = ?, winner_id = ?, game_duration = ?
+                WHERE game_id = ?
+            ''', (end_time, self.current_round, self.player_db_ids.get(winner_id),
+                  duration, self.game_db_id))
+            
+            # 更新參與者排名
+            c.execute(f'''
+                WITH r(player_id, final_rank, eliminated_round, won) AS (VALUES {values})
+                UPDATE game_participants
+                SET final_rank = r.final_rank, eliminated_round = r.eliminated_round
+                FROM r
+                WHERE game_participants.game_id = ?
+                  AND game_participants.player_id = r.player_id
+            ''', params + [self.game_db_id])
+            
+            # 更新玩家統計
+            c.execute(f'''
+                WITH r(player_id, final_rank, eliminated_round, won) AS (VALUES {values})
                 UPDATE players
                 SET total_games = total_games + 1,
-                    total_wins = total_wins + ?,
-                    total_losses = total_losses + ?,
-                    win_rate = ROUND(CAST(total_wins + ? AS FLOAT) / 
+                    total_wins = total_wins + r.won,
+                    total_losses = total_losses + 1 - r.won,
+                    win_rate = ROUND(CAST(total_wins + r.won AS FLOAT) / 
                                     (total_games + 1) * 100, 2)
-                WHERE username = ?
-            ''', (1 if is_winner else 0, 
-                  0 if is_winner else 1,
-                  1 if is_winner else 0,
-                  f"player_{player.id}"))
+                FROM r
+                WHERE players.player_id = r.player_id
+            ''', params)
         
-        conn.commit()
-        conn.close()
-    
-    def _is_prime(self, n: int) -> bool:
-        """判斷是否為質數"""
-        if n < 2:
-            return False
-        if n == 2:
-            return True
-        if n % 2 == 0:
-            return False
-        for i in range(3, int(n ** 0.5) + 1, 2):
-            if n % i == 0:
-                return False
-        return True
+        # 同步更新記憶體內排行榜 (其他 worker 透過 cluster 更新)
+        results = [(f"player_{player.id}", player.name, player.is_ai, player.id == winner_id)
+                   for player in self.players]
+        for result in results:
+            leaderboard.record_result(*result)
+        cluster.publish_nowait({"kind": "leaderboard", "results": results}, local=False)
     
     def generate_hints(self) -> List[str]:
-        """根據爆掉數字生成提示(最多2個)"""
-        num = self.secret_number
-        player_count = len(self.players)
-        all_hints = []
-        
-        # 1. 2的倍數
-        if num % 2 == 0:
-            all_hints.append("2的倍數")
-        
-        # 2. 3的倍數
-        if num % 3 == 0:
-            all_hints.append("3的倍數")
-        
-        # 3. 5的倍數
-        if num % 5 == 0:
-            all_hints.append("5的倍數")
-        
-        # 4. 7的倍數
-        if num % 7 == 0:
-            all_hints.append("7的倍數")
-        
-        # 5. 質數
-        if self._is_prime(num):
-            all_hints.append("質數")
-        
-        # 6. 爆掉數字含有1或2
-        if '1' in str(num) or '2' in str(num):
-            all_hints.append("數字含有1或2")
-        
-        # 7. 2跟3的公倍數 (6的倍數)
-        if num % 6 == 0:
-            all_hints.append("2跟3的公倍數")
-        
-        # 8. 爆掉數字+1為4的倍數
-        if (num + 1) % 4 == 0:
-            all_hints.append("爆掉數字+1為4的倍數")
-        
-        # 9. 15以內的數字
-        if num <= 15:
-            all_hints.append("15以內的數字")
-        
-        # 10. 爆掉數字為玩家人數+1或-1的倍數
-        if player_count > 1:
-            if num % (player_count + 1) == 0:
-                all_hints.append(f"玩家人數+1的倍數({player_count + 1}的倍數)")
-            elif num % (player_count - 1) == 0 and player_count > 2:
-                all_hints.append(f"玩家人數-1的倍數({player_count - 1}的倍數)")
-        
-        # 隨機選擇1個提示
-        if len(all_hints) > 0:
-            selected_hints = random.sample(all_hints, 1)
-        else:
-            selected_hints = []
-        
-        return selected_hints
+        """根據爆掉數字生成提示 (查詢 hints.py 預先計算的提示表)"""
+        return hint_tables.pick(self.secret_number, len(self.players))
     
     def _start_round(self):
         if self.current_round == 1:
@@ -445,7 +449,7 @@ class GameState:
             self.number_range = (1, 15)
         
         self.secret_number = random.randint(*self.number_range)
-        self.called_numbers.clear()
+        self.called_mask = 0
         
         # 生成本輪提示
         self.hints = self.generate_hints()
@@ -455,9 +459,15 @@ class GameState:
                 player.pass_available = True
                 player.reverse_available = True
         
-        print(f"[Round {self.current_round}] 密碼: {self.secret_number}, 提示: {self.hints}")
+        if self.verbose:
+            print(f"[Round {self.current_round}] 密碼: {self.secret_number}, 提示: {self.hints}")
     
-    def get_current_player(self) -> Player:
+    @property
+    def called_numbers(self) -> List[int]:
+        """已喊過的號碼 (遞增排序)"""
+        return board.numbers_of(self.called_mask)
+
+    def get_current_player(self) -> GamePlayer:
         return self.players[self.current_player_index]
     
     def next_player(self):
@@ -482,9 +492,7 @@ class GameState:
         alive_players = [p for p in self.players if p.is_alive]
         
         if len(alive_players) == 1:
-            winner = alive_players[0]
-            self._update_game_end(winner.id)
-            self.reset_room_status()
+            self._on_game_over(alive_players[0].id)
             return True
         
         if len(alive_players) > 1:
@@ -495,33 +503,170 @@ class GameState:
         
         return False
 
+    def _on_game_over(self, winner_id: int):
+        """遊戲結束：寫入結果並釋放伺服器端資源 (批次模擬會覆寫)"""
+        self._update_game_end(winner_id)
+        action_journal.flush()
+        ai_scheduler.cancel(self.game_id)
+        self.reset_room_status()
+        # 結果已寫入資料庫：只保留精簡的最終狀態，一段時間後移除
+        games.archive(self.game_id, {**self.status(), "archived": True})
+        expiry_scheduler.schedule(("game", self.game_id), time.time() + FINISHED_GAME_TTL)
+
+    # ----- 玩家行動 (違反規則時拋出 GameRuleError) -----
+    def _check_turn(self, player_id: int) -> GamePlayer:
+        # Compare player id with the current player's id (not the index)
+        current_player = self.get_current_player()
+        if player_id != current_player.id:
+            raise GameRuleError("不是你的回合")
+        return current_player
+
+    def call(self, player_id: int, numbers: List[int]):
+        """喊號，回傳 (是否踩中密碼, 遊戲是否結束)"""
+        self._check_turn(player_id)
+        
+        if len(numbers) < 1 or len(numbers) > 3:
+            raise GameRuleError("必須喊 1-3 個號碼")
+        
+        if not board.is_consecutive(numbers):
+            raise GameRuleError("號碼必須連續")
+        
+        if min(numbers) < self.number_range[0] or max(numbers) > self.number_range[1]:
+            raise GameRuleError(f"號碼必須在 {self.number_range[0]}-{self.number_range[1]} 之間")
+        
+        called = board.mask_of(numbers)
+        if called & self.called_mask:
+            raise GameRuleError("有號碼已經被喊過了")
+        
+        self.called_mask |= called
+        hit_secret = bool(called >> self.secret_number & 1)
+        
+        # Update Range
+        if not hit_secret:
+            self.number_range = board.narrow_range(*self.number_range, called, self.secret_number)
+        
+        # 保存行動
+        self._save_action(player_id, 'call', numbers, hit_secret)
+        
+        if hit_secret:
+            return True, self.eliminate_current_player()
+        self.next_player()
+        return False, False
+
+    def use_pass(self, player_id: int):
+        player = self._check_turn(player_id)
+        if not player.pass_available:
+            raise GameRuleError("Pass 已經使用過了")
+        
+        player.pass_available = False
+        self._save_action(player_id, 'pass')
+        self.next_player()
+
+    def use_reverse(self, player_id: int):
+        player = self._check_turn(player_id)
+        if not player.reverse_available:
+            raise GameRuleError("迴轉已經使用過了")
+        
+        player.reverse_available = False
+        self.direction *= -1
+        self._save_action(player_id, 'reverse')
+        self.next_player()
+
+    def decide_ai_action(self) -> dict:
+        """由目前的 AI 玩家決策 (不執行)"""
+        current_player = self.get_current_player()
+        ai = self.ai_manager[current_player.id]
+        
+        # 計算可用號碼
+        available = board.available_mask(*self.number_range, self.called_mask)
+        
+        game_state = {
+            'number_range': self.number_range,
+            'called_numbers': self.called_numbers,
+            'players': [p.to_dict() for p in self.players],
+            'direction': self.direction,
+            'current_round': self.current_round,
+        }
+        
+        return ai.decide_action(
+            game_state,
+            available,
+            current_player.pass_available,
+            current_player.reverse_available
+        )
+
+    def status(self) -> dict:
+        """GET /api/game/status 的回應內容 (遊戲結束時也作為封存摘要)"""
+        alive_players = [p for p in self.players if p.is_alive]
+        game_over = len(alive_players) <= 1
+        return {
+            "game_id": self.game_id,
+            "seq": self.seq,
+            "current_round": self.current_round,
+            "current_player": self.players[self.current_player_index].id,
+            "number_range": list(self.number_range),
+            "called_numbers": self.called_numbers,
+            "players": [p.to_dict() for p in self.players],
+            "direction": self.direction,
+            "game_over": game_over,
+            "winner": alive_players[0].id if game_over else None,
+            "hints": self.hints  # 添加提示
+        }
+
+    def _public_fields(self) -> dict:
+        """客戶端同步用的遊戲欄位 (不含 action_history)"""
+        return {
+            "current_round": self.current_round,
+            "current_player": self.players[self.current_player_index].id,
+            "number_range": list(self.number_range),
+            "called_numbers": self.called_numbers,
+            "players": [p.to_dict() for p in self.players],
+            "direction": self.direction,
+            "game_over": sum(1 for p in self.players if p.is_alive) <= 1,
+            "hints": self.hints,
+        }
+
+    def snapshot(self) -> dict:
+        """最後一次發佈 (seq) 時的完整狀態，供重新連線或偵測到缺號時同步"""
+        history = self.action_history[:self._published_actions]
+        return {
+            "game_id": self.game_id,
+            "seq": self.seq,
+            **self._published,
+            "action_history": history,
+            "last_action": history[-1] if history else None,
+        }
+
+    def publish_delta(self) -> dict:
+        """與上次發佈比較，只回傳有變動的欄位與新增的行動，並遞增 seq"""
+        fields = self._public_fields()
+        changes = {k: v for k, v in fields.items() if self._published.get(k) != v}
+        actions = self.action_history[self._published_actions:]
+        
+        self.seq += 1
+        self._published = fields
+        self._published_actions = len(self.action_history)
+        return {
+            "game_id": self.game_id,
+            "seq": self.seq,
+            "changes": changes,
+            "actions": actions,
+        }
+
     def reset_room_status(self):
         """Reset room status when game ends"""
-        # Find which room this game belongs to
-        # This is a bit inefficient, but works for now
-        for room in rooms.values():
-            if room.game_id == self.game_id:
-                room.status = RoomStatus.WAITING
-                room.game_id = None
-                room.last_activity = datetime.now() # Update activity
-                # Broadcast update
-                # We need to run this async, but we are in a sync method.
-                # In FastAPI, we can use background tasks or just fire and forget if we had the loop.
-                # However, _update_game_end is called internally.
-                # Let's just update the state for now. The polling/websocket will pick it up eventually?
-                # No, we want real-time.
-                # We can't easily await here without changing everything to async.
-                # For now, let's just update the room state. The clients in the room will need to handle "game over" navigation.
-                # When they navigate back to room, they will fetch status.
-                # But for lobby, we want to show it's waiting again.
-                # We can try to use the event loop if available.
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        loop.create_task(notify_room_update(room.room_id, room))
-                except:
-                    pass
-                break
+        room = rooms.unbind_game(self.game_id)
+        if room is None:
+            return
+        room.status = RoomStatus.WAITING
+        room.last_activity = datetime.now() # Update activity
+        # We are in a sync method; schedule the broadcast on the running loop if any.
+        try:
+            loop = asyncio.get_event_loop()
+            if loop.is_running():
+                loop.create_task(notify_room_update(room.room_id, room))
+        except:
+            pass
 
 
 # ===== 請求模型 =====
@@ -542,54 +687,32 @@ class UseReverseRequest(BaseModel):
     player_id: int
 
 # ===== 遊戲狀態 =====
-games = {}
-# Dynamic rooms dictionary
-rooms: dict[int, "Room"] = {}
+# 進行中的遊戲 (數量上限 + LRU) 與已結束遊戲的精簡封存
+games = GameRegistry()
+ROOM_IDLE_TIMEOUT = int(os.environ.get("ROOM_IDLE_TIMEOUT", "7200"))  # 2 hours
+FINISHED_GAME_TTL = int(os.environ.get("FINISHED_GAME_TTL", "600"))
+# 房間閒置與封存遊戲的到期排程，key 為 ("room", room_id) / ("game", game_id)
+expiry_scheduler = ExpiryScheduler()
+# Dynamic rooms registry (room_id -> Room, plus game_id -> room_id index)
+rooms = RoomRegistry(joinable_status=RoomStatus.WAITING, expiry=expiry_scheduler,
+                     idle_timeout=ROOM_IDLE_TIMEOUT)
+
+def _on_game_evicted(game_id: str, game: "GameState"):
+    # 超過進行中遊戲上限而被淘汰 (最久未存取，通常是被放棄的遊戲)
+    print(f"[Games] evicted inactive game {game_id}")
+    ai_scheduler.cancel(game_id)
+    game.reset_room_status()
+
+games.on_evict = _on_game_evicted
 
 # ===== WebSocket 管理 =====
-class ConnectionManager:
-    def __init__(self):
-        # active_connections: List[WebSocket] = []
-        self.lobby_connections: List[WebSocket] = []
-        self.room_connections: dict[int, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, room_id: int = None):
-        await websocket.accept()
-        if room_id is None:
-            self.lobby_connections.append(websocket)
-        else:
-            if room_id not in self.room_connections:
-                self.room_connections[room_id] = []
-            self.room_connections[room_id].append(websocket)
-
-    def disconnect(self, websocket: WebSocket, room_id: int = None):
-        if room_id is None:
-            if websocket in self.lobby_connections:
-                self.lobby_connections.remove(websocket)
-        else:
-            if room_id in self.room_connections and websocket in self.room_connections[room_id]:
-                self.room_connections[room_id].remove(websocket)
-
-    async def broadcast_lobby(self, message: dict):
-        for connection in self.lobby_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to lobby: {e}")
-                # traceback.print_exc()
-                pass # Handle disconnected clients
-
-    async def broadcast_room(self, room_id: int, message: dict):
-        if room_id in self.room_connections:
-            for connection in self.room_connections[room_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error broadcasting to room {room_id}: {e}")
-                    traceback.print_exc()
-                    pass
-
 manager = ConnectionManager()
+# 多 worker 部署 (GAME_WORKERS > 1) 時的分區與跨程序廣播；預設為單一程序
+cluster = create_cluster()
+# 伺服器端 AI 回合 (run_turn 於下方 AI 行動區段設定)
+ai_scheduler = AITurnScheduler()
+# 每場遊戲一個 actor，序列化 call / pass / reverse / AI 行動 (on_batch 於下方設定)
+game_actors = GameActors()
 
 @app.websocket("/ws/{client_type}")
 async def websocket_endpoint(websocket: WebSocket, client_type: str):
@@ -606,89 +729,335 @@ async def websocket_endpoint(websocket: WebSocket, client_type: str):
     try:
         while True:
             data = await websocket.receive_text()
-            # Handle incoming messages if needed, e.g. chat
-            # For now we just keep connection open
+            manager.touch(websocket)
+            if data == PONG_MESSAGE:
+                continue
+            try:
+                reply = await route_client_message(room_id, data)
+            except Exception as e:
+                # 單一訊息處理失敗不影響連線
+                print(f"WebSocket message handling failed ({client_type}): {e!r}")
+                continue
+            if reply is not None:
+                # 經由連線的送出佇列，回覆不會超前已排入的廣播
+                await manager.send(websocket, reply)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, room_id)
 
+async def route_client_message(room_id: Optional[int], data: str) -> Optional[dict]:
+    """房間訊息交給擁有該房間的 worker 處理"""
+    if room_id is None or cluster.owns(room_id):
+        return await handle_client_message(room_id, data)
+    try:
+        return await cluster.request(cluster.owner_of(room_id),
+                                     {"kind": "ws", "room_id": room_id, "data": data})
+    except ClusterUnavailable as e:
+        print(f"[Cluster] could not route message for room {room_id}: {e}")
+        return None
+
+async def handle_client_message(room_id: Optional[int], data: str) -> Optional[dict]:
+    """處理客戶端送來的訊息，回傳要回覆給該連線的訊息 (沒有則為 None)"""
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(message, dict):
+        return None
+    
+    # 重新連線或偵測到 seq 缺號時，回傳完整的遊戲快照
+    if message.get("type") == "game_snapshot_request":
+        game_id = message.get("game_id")
+        if game_id is not None and not isinstance(game_id, str):
+            return {"type": "error", "detail": "game_id 必須是字串"}
+        game = games.get(game_id)
+        if game is None and room_id in rooms:
+            game = games.get(rooms[room_id].game_id)
+        snapshot = game.snapshot() if game is not None else games.get_archived(game_id)
+        if snapshot is not None:
+            return {"type": "game_snapshot", "game": snapshot}
+    
+    # 遊戲行動 (call / pass / reverse / ai)，回覆帶有相同 request_id 的 game_action_ack
+    if message.get("type") == "game_action":
+        return await handle_game_action(room_id, message)
+    return None
+
+# ===== 多 worker 部署 =====
+async def _on_cluster_broadcast(message: dict):
+    if message["room_id"] is None:
+        await manager.deliver_lobby(message["text"])
+    else:
+        await manager.deliver_room(message["room_id"], message["text"])
+
+async def _on_cluster_close_room(message: dict):
+    await manager.close_room(message["room_id"])
+
+async def _on_cluster_leaderboard(message: dict):
+    for result in message["results"]:
+        leaderboard.record_result(*result)
+
+async def _on_cluster_http(message: dict):
+    return await call_asgi(app, message)
+
+async def _on_cluster_ws(message: dict):
+    return await handle_client_message(message["room_id"], message["data"])
+
+cluster.on("broadcast", _on_cluster_broadcast)
+cluster.on("close_room", _on_cluster_close_room)
+cluster.on("leaderboard", _on_cluster_leaderboard)
+cluster.on("http", _on_cluster_http)
+cluster.on("ws", _on_cluster_ws)
+
+async def publish_broadcast(room_id: Optional[int], text: str):
+    await cluster.publish({"kind": "broadcast", "room_id": room_id, "text": text})
+
+if cluster.workers > 1:
+    manager.publish = publish_broadcast
+
+ROOM_PATH = re.compile(r"^/api/rooms/(\d+)(/|$)")
+
+async def _request_owner(request: Request) -> Optional[int]:
+    """請求所屬房間 / 遊戲的擁有者 worker (不屬於特定房間或遊戲時為 None)"""
+    path = request.url.path
+    match = ROOM_PATH.match(path)
+    if match:
+        return cluster.owner_of(int(match.group(1)))
+    if path.startswith("/api/game/") and path != "/api/game/start":
+        game_id = request.query_params.get("game_id")
+        if game_id is None and request.method == "POST":
+            try:
+                body = json.loads(await request.body() or b"{}")
+                game_id = body.get("game_id") if isinstance(body, dict) else None
+            except ValueError:
+                game_id = None
+        if game_id:
+            return cluster.owner_of(game_id)
+    return None
+
+def _forward_message(request: Request, body: bytes = b"") -> dict:
+    return {
+        "kind": "http",
+        "method": request.method,
+        "path": request.url.path,
+        "query": request.url.query,
+        "headers": [[k, v] for k, v in request.headers.items()
+                    if k not in ("host", "content-length", "if-none-match")],
+        "body": body.decode(),
+    }
+
+def _reply_response(reply: dict) -> Response:
+    headers = {k: v for k, v in reply["headers"] if k.lower() != "content-length"}
+    return Response(content=reply["body"], status_code=reply["status"], headers=headers)
+
+def _room_sort_key(room: dict):
+    return (datetime.fromisoformat(room["last_activity"]).timestamp(), room["room_id"])
+
+async def _gather_room_listing(request: Request) -> Response:
+    """向所有 worker 查詢同一頁，依 (last_activity, room_id) 合併"""
+    replies = await cluster.gather(_forward_message(request))
+    if any(reply is None for reply in replies):
+        return JSONResponse(status_code=503, content={"detail": "伺服器忙碌中，請稍後再試"})
+    for reply in replies:
+        if reply["status"] != 200:
+            return _reply_response(reply)
+    
+    etags = [dict((k.lower(), v) for k, v in reply["headers"]).get("etag", "") for reply in replies]
+    etag = f'W/"rooms-cluster-{zlib.crc32("|".join(etags).encode()):08x}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    pages = [json.loads(reply["body"]) for reply in replies]
+    merged = sorted((room for page in pages for room in page["rooms"]),
+                    key=_room_sort_key, reverse=True)
+    has_more = any(page["next_cursor"] for page in pages)
+    limit = request.query_params.get("limit")
+    if limit is not None and len(merged) > int(limit):
+        merged = merged[:int(limit)]
+        has_more = True
+    next_cursor = encode_cursor(_room_sort_key(merged[-1])) if has_more and merged else None
+    return Response(content=encode_message({"rooms": merged, "next_cursor": next_cursor}),
+                    media_type="application/json", headers={"ETag": etag})
+
+async def cluster_routing(request: Request, call_next):
+    """房間 / 遊戲相關的請求轉送給擁有者 worker，房間列表合併所有 worker"""
+    if request.headers.get(FORWARDED_HEADER):
+        return await call_next(request)
+    if request.url.path == "/api/rooms" and request.method == "GET":
+        return await _gather_room_listing(request)
+    owner = await _request_owner(request)
+    if owner is None or owner == cluster.worker_index:
+        return await call_next(request)
+    try:
+        reply = await cluster.request(owner, _forward_message(request, await request.body()))
+    except ClusterUnavailable as e:
+        print(f"[Cluster] forward to worker {owner} failed: {e}")
+        reply = None
+    if reply is None:
+        return JSONResponse(status_code=503, content={"detail": "伺服器忙碌中，請稍後再試"})
+    return _reply_response(reply)
+
+# 單一 worker 時不安裝：BaseHTTPMiddleware 會讓每個請求多經過一層 task 與串流包裝
+if cluster.workers > 1:
+    app.middleware("http")(cluster_routing)
+
 # Helper to broadcast updates
-async def notify_lobby_update():
-    # Broadcast simplified room list or just a "refresh" signal
-    # Sending full list might be heavy if frequent, but for 100 rooms it's okay-ish.
-    # Let's send a "rooms_updated" event and let frontend fetch, or send the changed room.
-    # For simplicity, let's send the updated room info if possible, or just trigger fetch.
-    # Let's send "refresh" for now to keep it simple and consistent.
-    await manager.broadcast_lobby({"type": "refresh"})
+LOBBY_COALESCE_MS = int(os.environ.get("LOBBY_COALESCE_MS", "150"))
+
+class LobbyNotifier:
+    """合併一段時間內的房間變動，只送一則帶有房間摘要的大廳訊息
+
+    視窗內多次 join / leave / start 只會產生一則 rooms_updated，
+    內容直接附上變動房間的資料 (已刪除的房間放在 removed)，
+    大廳客戶端不需要再呼叫 GET /api/rooms；version 沒有改變的房間不會重送。
+    """
+
+    def __init__(self, window_ms: int = LOBBY_COALESCE_MS):
+        self.window = window_ms / 1000
+        self._dirty: set = set()
+        self._sent: dict = {}
+        self._task: Optional[asyncio.Task] = None
+        self.messages_sent = 0
+
+    def mark(self, room_id: int):
+        self._dirty.add(room_id)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        dirty, self._dirty = self._dirty, set()
+        self._task = None
+        
+        updated, removed = [], []
+        for room_id in dirty:
+            room = rooms.get(room_id)
+            if room is None:
+                if self._sent.pop(room_id, None) is not None:
+                    removed.append(room_id)
+                continue
+            if self._sent.get(room_id) != room.version:
+                self._sent[room_id] = room.version
+                updated.append(room.to_dict())
+        
+        if updated or removed:
+            self.messages_sent += 1
+            await manager.broadcast_lobby({
+                "type": "rooms_updated",
+                "rooms": updated,
+                "removed": removed,
+            })
+
+lobby_notifier = LobbyNotifier()
+
+async def notify_lobby_update(room_id: int):
+    lobby_notifier.mark(room_id)
+
+async def notify_game_update(game: "GameState"):
+    """廣播遊戲所屬房間的更新 (透過 game -> room 對照，O(1))"""
+    room = rooms.room_for_game(game.game_id)
+    if room is not None:
+        await notify_room_update(room.room_id, room)
 
 async def notify_room_update(room_id: int, room: Room):
-    # If the room has an active game, include game state in the broadcast so
-    # in-game clients can sync without extra polling.
+    await send_room_update(room_id, room_update_payload(room))
+
+def room_update_payload(room: Room) -> dict:
+    # If the room has an active game, attach only what changed since the last
+    # broadcast (versioned by seq). Clients that miss a seq ask for a snapshot.
     payload = {"type": "room_update", "room": room.to_dict()}
-    print(f"Broadcasting update for room {room_id}, has_game={bool(room.game_id)}")
+    print(f"Broadcasting update for room {room.room_id}, has_game={bool(room.game_id)}")
     if room.game_id and room.game_id in games:
-        game = games.get(room.game_id)
-        payload["game"] = {
-            "game_id": game.game_id,
-            "current_round": game.current_round,
-            "current_player": game.players[game.current_player_index].id,
-            "number_range": game.number_range,
-            "called_numbers": list(game.called_numbers),
-            "players": [p.dict() for p in game.players],
-            "direction": game.direction,
-            "game_over": len([p for p in game.players if p.is_alive]) <= 1,
-            "hints": game.hints,  # 添加提示
-            "action_history": game.action_history, # 添加行動記錄
-        }
-
-        # include last action (if any) so clients can show transient highlights
-        try:
-            if hasattr(game, 'action_history') and len(game.action_history) > 0:
-                payload['game']['last_action'] = game.action_history[-1]
-            else:
-                payload['game']['last_action'] = None
-        except Exception as e:
-            print(f"Failed to attach last_action to payload: {e}")
+        payload["game_delta"] = games[room.game_id].publish_delta()
+    return payload
 
+async def send_room_update(room_id: int, payload: dict):
     await manager.broadcast_room(room_id, payload)
-    await notify_lobby_update() # Lobby also needs to know status changed
+    await notify_lobby_update(room_id) # Lobby also needs to know status changed
 
 # ===== Background Tasks =====
-async def cleanup_inactive_rooms():
+async def expire_due_entries():
+    """睡到最早的到期時間，只處理已到期的房間與遊戲"""
+    wakeup = asyncio.Event()
+    expiry_scheduler.wakeup = wakeup.set
     while True:
-        await asyncio.sleep(60) # Check every minute
-        now = datetime.now()
-        rooms_to_delete = []
-        for room_id, room in rooms.items():
-            # If room is empty, it should have been deleted, but check just in case
-            if len(room.players) == 0:
-                rooms_to_delete.append(room_id)
-                continue
-            
-            # Check inactivity (2 hours)
-            if (now - room.last_activity).total_seconds() > 7200: # 2 hours
-                rooms_to_delete.append(room_id)
+        next_deadline = expiry_scheduler.next_deadline()
+        timeout = None if next_deadline is None else max(next_deadline - time.time(), 0)
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
         
-        for room_id in rooms_to_delete:
-            if room_id in rooms:
-                del rooms[room_id]
-                # Notify lobby?
-                await notify_lobby_update()
-                # Close websocket connections for this room
-                if room_id in manager.room_connections:
-                    for ws in manager.room_connections[room_id]:
-                        await ws.close()
-                    del manager.room_connections[room_id]
+        for kind, key in expiry_scheduler.pop_due():
+            try:
+                if kind == "room":
+                    await expire_room(key)
+                elif kind == "game":
+                    games.pop(key, None)
+            except Exception as e:
+                print(f"Error expiring {kind} {key}: {e}")
+
+async def expire_room(room_id: int):
+    room = rooms.remove(room_id)
+    if room is None:
+        return
+    if room.game_id:
+        ai_scheduler.cancel(room.game_id)
+        games.pop(room.game_id, None)
+    # Notify lobby
+    await notify_lobby_update(room_id)
+    # Close websocket connections for this room (on every worker)
+    await cluster.publish({"kind": "close_room", "room_id": room_id})
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(cleanup_inactive_rooms())
+    await cluster.start()
+    manager.start_heartbeat()
+    leaderboard.load(await read_executor.run(_query_leaderboard_rows))
+    # 策略表第一次啟動時需要計算數秒，之後從磁碟載入
+    await asyncio.get_running_loop().run_in_executor(None, strategy_tables.load)
+    asyncio.create_task(expire_due_entries())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await cluster.stop()
+    await manager.stop()
+    action_journal.stop()
+    read_executor.close()
+    database.close()
 
 # ===== API 端點 =====
 @app.get("/api/rooms")
-async def get_rooms():
-    return {
-        "rooms": [room.to_dict() for room in rooms.values()]
-    }
+async def get_rooms(request: Request,
+                    status: Optional[RoomStatus] = None,
+                    has_password: Optional[bool] = None,
+                    min_free_slots: int = 0,
+                    limit: Optional[int] = None,
+                    cursor: Optional[str] = None):
+    """房間列表：依 last_activity 由新到舊，支援篩選與 cursor 分頁"""
+    if limit is not None and limit < 1:
+        raise HTTPException(400, "limit 必須大於 0")
+    
+    # ETag 由註冊表版本與查詢條件組成；沒有變動時回 304，不做任何序列化
+    etag = rooms.etag(str(request.query_params))
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    is_default_query = not request.query_params
+    body = rooms.cached_listing() if is_default_query else None
+    if body is None:
+        try:
+            page, next_cursor = rooms.query(status, has_password, min_free_slots, limit, cursor)
+        except ValueError:
+            raise HTTPException(400, "cursor 格式錯誤")
+        body = encode_message({
+            "rooms": [room.to_dict() for room in page],
+            "next_cursor": next_cursor,
+        })
+        if is_default_query:
+            rooms.store_listing(body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @app.get("/api/rooms/{room_id}")
 async def get_room(room_id: int):
@@ -710,7 +1079,8 @@ async def create_room(request: CreateRoomRequest):
         # Generate a random room ID (6 digits)
         while True:
             room_id = random.randint(100000, 999999)
-            if room_id not in rooms:
+            # 只挑選由本 worker 擁有的 id，其他 worker 不會產生相同的房間
+            if room_id not in rooms and cluster.owns(room_id):
                 break
         
         new_room = Room(room_id)
@@ -735,7 +1105,7 @@ async def create_room(request: CreateRoomRequest):
         
         rooms[room_id] = new_room
         
-        await notify_lobby_update()
+        await notify_lobby_update(room_id)
         
         return {
             "room": new_room.to_dict(),
@@ -822,7 +1192,7 @@ async def leave_room_action(room_id: int, request: LeaveRoomRequest):
         # Broadcast update so everyone knows they are removed
         await notify_room_update(room_id, room)
         del rooms[room_id]
-        await notify_lobby_update()
+        await notify_lobby_update(room_id)
         return {"success": True, "message": "Room deleted"}
 
     # Broadcast update
@@ -846,8 +1216,9 @@ async def start_room_game(room_id: int):
     game = GameState(player_dicts)
     
     games[game.game_id] = game
-    room.game_id = game.game_id
+    rooms.bind_game(room_id, game.game_id)
     room.status = RoomStatus.PLAYING
+    schedule_ai_turn(game)
     
     # Broadcast update with game_started event
     await manager.broadcast_room(room_id, {
@@ -855,7 +1226,7 @@ async def start_room_game(room_id: int):
         "game_id": game.game_id,
         "room": room.to_dict()
     })
-    await notify_lobby_update()
+    await notify_lobby_update(room_id)
     
     return {
         "success": True,
@@ -870,286 +1241,234 @@ async def start_game(request: StartGameRequest):
     
     game = GameState(request.players)
     games[game.game_id] = game
+    schedule_ai_turn(game)
     
     return {
         "game_id": game.game_id,
         "current_round": game.current_round,
         "number_range": game.number_range,
         "current_player": game.players[game.current_player_index].id,
-        "players": [p.dict() for p in game.players],
-        "called_numbers": list(game.called_numbers),
+        "players": [p.to_dict() for p in game.players],
+        "called_numbers": game.called_numbers,
         "direction": game.direction,
         "game_over": False,
         "winner": None,
         "hints": game.hints  # 添加提示
     }
 
-@app.post("/api/game/call")
-async def call_numbers(request: CallNumbersRequest):
-    game = games.get(request.game_id)
-    if not game:
-        raise HTTPException(404, "遊戲不存在")
-    
-    numbers = request.numbers
-    # Compare player id with the current player's id (not the index)
+# 遊戲變更一律透過 game_actors 序列化 (actors.py)；以下為在 actor 內執行的同步指令
+def call_command(game: GameState, player_id: int, numbers: List[int]) -> dict:
     current_player = game.get_current_player()
-    print(f"Call Request: player={request.player_id}, current_player_id={current_player.id}, numbers={numbers}")
-    if request.player_id != current_player.id:
-        print(f"Turn Mismatch: req={request.player_id} != curr={current_player.id}")
-        raise HTTPException(400, "不是你的回合")
-    
-    if len(numbers) < 1 or len(numbers) > 3:
-        raise HTTPException(400, "必須喊 1-3 個號碼")
-    
-    numbers_sorted = sorted(numbers)
-    for i in range(len(numbers_sorted) - 1):
-        if numbers_sorted[i+1] - numbers_sorted[i] != 1:
-            raise HTTPException(400, "號碼必須連續")
-    
-    if any(n < game.number_range[0] or n > game.number_range[1] for n in numbers):
-        raise HTTPException(400, f"號碼必須在 {game.number_range[0]}-{game.number_range[1]} 之間")
-    
-    if any(n in game.called_numbers for n in numbers):
-        raise HTTPException(400, "有號碼已經被喊過了")
-    
-    game.called_numbers.update(numbers)
-    hit_secret = game.secret_number in numbers
-    
-    # Update Range
-    if not hit_secret:
-        lower, upper = game.number_range
-        for n in numbers:
-            if n < game.secret_number:
-                lower = max(lower, n + 1)
-            elif n > game.secret_number:
-                upper = min(upper, n - 1)
-        game.number_range = (lower, upper)
-        print(f"Range Updated: {game.number_range}")
-    
-    # 保存行動
-    game._save_action(request.player_id, 'call', numbers, hit_secret)
+    print(f"Call Request: player={player_id}, current_player_id={current_player.id}, numbers={numbers}")
+    try:
+        hit_secret, game_over = game.call(player_id, numbers)
+    except GameRuleError as e:
+        print(f"Call Rejected: {e}")
+        raise
     
     if hit_secret:
-        game_over = game.eliminate_current_player()
-        # Broadcast updated room/game state to connected clients
-        try:
-            for rid, r in rooms.items():
-                if r.game_id == game.game_id:
-                    await notify_room_update(rid, r)
-                    break
-        except Exception as e:
-            print(f"Error broadcasting room update after hit: {e}")
-
         return {
             "success": True,
             "hit_secret": True,
-            "eliminated_player": request.player_id,
+            "eliminated_player": player_id,
             "game_over": game_over,
             "next_player": game.players[game.current_player_index].id if not game_over else None,
-            "called_numbers": list(game.called_numbers),
+            "called_numbers": game.called_numbers,
             "winner": next((p.id for p in game.players if p.is_alive), None) if game_over else None,
             "new_range": game.number_range
         }
-    else:
-        game.next_player()
-        print(f"Next Player: {game.players[game.current_player_index].id}")
-        # Broadcast updated room/game state to connected clients
-        try:
-            for rid, r in rooms.items():
-                if r.game_id == game.game_id:
-                    await notify_room_update(rid, r)
-                    break
-        except Exception as e:
-            print(f"Error broadcasting room update after next_player: {e}")
-
-        return {
-            "success": True,
-            "hit_secret": False,
-            "next_player": game.players[game.current_player_index].id,
-            "called_numbers": list(game.called_numbers),
-            "new_range": game.number_range
-        }
-
-@app.post("/api/game/pass")
-async def use_pass(request: UsePassRequest):
-    game = games.get(request.game_id)
-    if not game:
-        raise HTTPException(404, "遊戲不存在")
-    
-    # Ensure the request is from the current player (compare ids)
-    current_player = game.get_current_player()
-    if request.player_id != current_player.id:
-        raise HTTPException(400, "不是你的回合")
-
-    player = current_player
-    if not player.pass_available:
-        raise HTTPException(400, "Pass 已經使用過了")
-    
-    player.pass_available = False
-    game._save_action(request.player_id, 'pass')
-    game.next_player()
-    # Broadcast updated room/game state to connected clients
-    try:
-        for rid, r in rooms.items():
-            if r.game_id == game.game_id:
-                await notify_room_update(rid, r)
-                break
-    except Exception as e:
-        print(f"Error broadcasting room update after pass: {e}")
+    print(f"Range Updated: {game.number_range}")
+    print(f"Next Player: {game.players[game.current_player_index].id}")
+    return {
+        "success": True,
+        "hit_secret": False,
+        "next_player": game.players[game.current_player_index].id,
+        "called_numbers": game.called_numbers,
+        "new_range": game.number_range
+    }
 
+def pass_command(game: GameState, player_id: int) -> dict:
+    game.use_pass(player_id)
     return {
         "success": True,
         "next_player": game.players[game.current_player_index].id
     }
 
-@app.post("/api/game/reverse")
-async def use_reverse(request: UseReverseRequest):
-    game = games.get(request.game_id)
-    if not game:
-        raise HTTPException(404, "遊戲不存在")
-    
-    # Ensure the request is from the current player (compare ids)
-    current_player = game.get_current_player()
-    if request.player_id != current_player.id:
-        raise HTTPException(400, "不是你的回合")
-
-    player = current_player
-    if not player.reverse_available:
-        raise HTTPException(400, "迴轉已經使用過了")
-    
-    player.reverse_available = False
-    game.direction *= -1
-    game._save_action(request.player_id, 'reverse')
-    game.next_player()
-    # Broadcast updated room/game state to connected clients
-    try:
-        for rid, r in rooms.items():
-            if r.game_id == game.game_id:
-                await notify_room_update(rid, r)
-                break
-    except Exception as e:
-        print(f"Error broadcasting room update after reverse: {e}")
-
+def reverse_command(game: GameState, player_id: int) -> dict:
+    game.use_reverse(player_id)
     return {
         "success": True,
         "new_direction": game.direction,
         "next_player": game.players[game.current_player_index].id
     }
 
-@app.get("/api/game/status")
-async def get_status(game_id: str):
+def run_game_command(game_id: str, command, *args):
+    """在 actor 內執行：重新取得遊戲，排隊期間已結束 (已封存) 的遊戲不再接受行動"""
     game = games.get(game_id)
-    if not game:
+    if game is None or sum(1 for p in game.players if p.is_alive) <= 1:
+        raise GameRuleError("遊戲已結束")
+    return command(game, *args)
+
+async def submit_game_command(game_id: str, command, *args):
+    """在遊戲的 actor 內執行指令；規則錯誤轉為 400"""
+    if not games.get(game_id):
         raise HTTPException(404, "遊戲不存在")
-    
-    alive_players = [p for p in game.players if p.is_alive]
-    game_over = len(alive_players) <= 1
-    
-    return {
-        "game_id": game.game_id,
-        "current_round": game.current_round,
-        "current_player": game.players[game.current_player_index].id,
-        "number_range": game.number_range,
-        "called_numbers": list(game.called_numbers),
-        "players": [p.dict() for p in game.players],
-        "direction": game.direction,
-        "game_over": game_over,
-        "winner": alive_players[0].id if game_over else None,
-        "hints": game.hints  # 添加提示
-    }
+    try:
+        return await game_actors.submit(game_id, lambda: run_game_command(game_id, command, *args))
+    except GameRuleError as e:
+        raise HTTPException(400, str(e))
 
-@app.post("/api/game/ai-action")
-async def get_ai_action(game_id: str):
-    """讓 AI 執行行動"""
+def after_game_batch(game_id: str):
+    """actor 每批指令完成後：排入 AI 回合，組好本批的房間更新並回傳送出的協程"""
     game = games.get(game_id)
-    if not game:
+    if game is None:
+        # 遊戲已在本批結束並封存；房間狀態已由 _on_game_over 重設並廣播
+        return None
+    schedule_ai_turn(game)
+    room = rooms.room_for_game(game_id)
+    if room is None:
+        return None
+    return send_room_update(room.room_id, room_update_payload(room))
+
+game_actors.on_batch = after_game_batch
+
+@app.post("/api/game/call")
+async def call_numbers(request: CallNumbersRequest):
+    return await submit_game_command(request.game_id, call_command,
+                                     request.player_id, request.numbers)
+
+@app.post("/api/game/pass")
+async def use_pass(request: UsePassRequest):
+    return await submit_game_command(request.game_id, pass_command, request.player_id)
+
+@app.post("/api/game/reverse")
+async def use_reverse(request: UseReverseRequest):
+    return await submit_game_command(request.game_id, reverse_command, request.player_id)
+
+@app.get("/api/game/status")
+async def get_status(game_id: str):
+    game = games.get(game_id)
+    if game is not None:
+        return game.status()
+    # 已結束的遊戲回傳封存的最終狀態
+    archived = games.get_archived(game_id)
+    if archived is None:
         raise HTTPException(404, "遊戲不存在")
-    
+    return archived
+
+# ===== AI 行動 =====
+def schedule_ai_turn(game: GameState):
+    """輪到 AI 時由伺服器排入回合 (遊戲結束或輪到真人時不排)"""
+    current_player = game.get_current_player()
+    if (current_player.is_ai and current_player.id in game.ai_manager
+            and sum(1 for p in game.players if p.is_alive) > 1):
+        ai_scheduler.schedule(game.game_id)
+
+def ai_command(game: GameState):
+    """由目前的 AI 玩家決策並執行 (在 actor 內)，回傳 (player_id, action, 行動結果)"""
     current_player = game.get_current_player()
     
     if not current_player.is_ai:
         raise HTTPException(400, "當前玩家不是 AI")
     
-    # 獲取 AI 決策
-    ai = game.ai_manager.get(current_player.id)
-    if not ai:
+    if current_player.id not in game.ai_manager:
         raise HTTPException(500, "AI 不存在")
     
-    # 計算可用號碼
-    available = set(range(game.number_range[0], game.number_range[1] + 1)) - game.called_numbers
-    
-    game_state = {
-        'number_range': game.number_range,
-        'called_numbers': list(game.called_numbers),
-        'players': [p.dict() for p in game.players]
-    }
-    
-    action = ai.decide_action(
-        game_state,
-        available,
-        current_player.pass_available,
-        current_player.reverse_available
-    )
+    # 獲取 AI 決策
+    action = game.decide_ai_action()
     
     # 執行 AI 行動
     if action['action'] == 'call':
-        return await call_numbers(CallNumbersRequest(
-            game_id=game_id,
-            player_id=current_player.id,
-            numbers=action['numbers']
-        ))
+        result = call_command(game, current_player.id, action['numbers'])
     elif action['action'] == 'pass':
-        return await use_pass(UsePassRequest(
-            game_id=game_id,
-            player_id=current_player.id
-        ))
+        result = pass_command(game, current_player.id)
     elif action['action'] == 'reverse':
-        return await use_reverse(UseReverseRequest(
-            game_id=game_id,
-            player_id=current_player.id
-        ))
+        result = reverse_command(game, current_player.id)
+    return current_player.id, action, result
 
-# ===== 統計 API =====
-@app.get("/api/stats/leaderboard")
-async def get_leaderboard(limit: int = 10):
-    """獲取排行榜"""
-    conn = sqlite3.connect('game_records.db')
-    c = conn.cursor()
+async def run_scheduled_ai_turn(game_id: str):
+    """ai_scheduler 的回合：執行 AI 行動並把結果推送到房間"""
+    # 遊戲結束時房間會先解除對照，因此在行動前取得房間
+    room = rooms.room_for_game(game_id)
+    try:
+        player_id, action, result = await submit_game_command(game_id, ai_command)
+    except HTTPException as e:
+        # 排程與執行之間輪到真人 (例如舊客戶端已觸發 AI 行動) 或遊戲已結束
+        print(f"[AI] skipped turn for game {game_id}: {e.detail}")
+        return
+    if room is not None:
+        await manager.broadcast_room(room.room_id, {
+            "type": "ai_action",
+            "game_id": game_id,
+            "player_id": player_id,
+            "action": action,
+            "result": result,
+        })
+
+ai_scheduler.run_turn = run_scheduled_ai_turn
+
+@app.post("/api/game/ai-action")
+async def get_ai_action(game_id: str):
+    """讓 AI 立即執行行動 (相容舊客戶端；AI 回合平常由伺服器排程)"""
+    game = games.get(game_id)
+    if not game:
+        raise HTTPException(404, "遊戲不存在")
     
+    # 取消已排入的回合，避免同一個 AI 回合被執行兩次
+    ai_scheduler.cancel(game_id)
+    _, _, result = await submit_game_command(game_id, ai_command)
+    return result
+
+# ===== WebSocket 遊戲行動 =====
+# 與 HTTP 端點使用相同的請求模型與 actor 指令；錯誤以 HTTP 狀態碼與 detail 回報
+GAME_ACTIONS = {
+    "call": (CallNumbersRequest, call_numbers),
+    "pass": (UsePassRequest, use_pass),
+    "reverse": (UseReverseRequest, use_reverse),
+}
+
+async def handle_game_action(room_id: Optional[int], message: dict) -> dict:
+    ack = {"type": "game_action_ack", "request_id": message.get("request_id")}
+    action = message.get("action")
+    try:
+        # 先驗證訊息，之後只使用驗證過的 game_id (客戶端可能送來任意 JSON 值)
+        if action in GAME_ACTIONS:
+            model, endpoint = GAME_ACTIONS[action]
+            request = model.model_validate(message)
+            game_id = request.game_id
+        elif action == "ai":
+            game_id = message.get("game_id")
+            if not isinstance(game_id, str):
+                raise HTTPException(422, "game_id 必須是字串")
+        else:
+            raise HTTPException(400, "未知的遊戲行動")
+        room = rooms.room_for_game(game_id)
+        if room is None or room.room_id != room_id:
+            raise HTTPException(404, "遊戲不存在")
+        if action == "ai":
+            result = await get_ai_action(game_id)
+        else:
+            result = await endpoint(request)
+    except ValidationError as e:
+        print(f"Validation Error: {e}")
+        return {**ack, "ok": False, "status": 422, "detail": jsonable_encoder(e.errors())}
+    except HTTPException as e:
+        return {**ack, "ok": False, "status": e.status_code, "detail": e.detail}
+    return {**ack, "ok": True, "result": result}
+
+# ===== 統計 API =====
+# 查詢本身是阻塞的 sqlite3 呼叫，一律透過 read_executor 在獨立的
+# 唯讀連線執行緒池中執行，避免拖慢 WebSocket 廣播與遊戲行動。
+def _query_leaderboard_rows(c):
     c.execute('''
         SELECT username, nickname, total_games, total_wins, 
                total_losses, win_rate, is_ai
         FROM players
         WHERE total_games > 0
-        ORDER BY win_rate DESC, total_wins DESC
-        LIMIT ?
-    ''', (limit,))
-    
-    results = c.fetchall()
-    conn.close()
-    
-    return {
-        "leaderboard": [
-            {
-                "rank": i + 1,
-                "username": row[0],
-                "nickname": row[1],
-                "total_games": row[2],
-                "total_wins": row[3],
-                "total_losses": row[4],
-                "win_rate": row[5],
-                "is_ai": bool(row[6])
-            }
-            for i, row in enumerate(results)
-        ]
-    }
+    ''')
+    return c.fetchall()
 
-@app.get("/api/stats/player/{username}")
-async def get_player_stats(username: str):
-    """獲取玩家統計"""
-    conn = sqlite3.connect('game_records.db')
-    c = conn.cursor()
-    
+def _query_player_stats(c, username: str):
     c.execute('''
         SELECT username, nickname, total_games, total_wins, 
                total_losses, win_rate, is_ai, created_at
@@ -1158,10 +1477,8 @@ async def get_player_stats(username: str):
     ''', (username,))
     
     result = c.fetchone()
-    
     if not result:
-        conn.close()
-        raise HTTPException(404, "玩家不存在")
+        return None, []
     
     # 獲取最近遊戲記錄
     c.execute('''
@@ -1175,36 +1492,9 @@ async def get_player_stats(username: str):
         LIMIT 10
     ''', (username,))
     
-    recent_games = c.fetchall()
-    conn.close()
-    
-    return {
-        "username": result[0],
-        "nickname": result[1],
-        "total_games": result[2],
-        "total_wins": result[3],
-        "total_losses": result[4],
-        "win_rate": result[5],
-        "is_ai": bool(result[6]),
-        "created_at": result[7],
-        "recent_games": [
-            {
-                "game_id": game[0],
-                "start_time": game[1],
-                "end_time": game[2],
-                "rank": game[3],
-                "eliminated_round": game[4]
-            }
-            for game in recent_games
-        ]
-    }
+    return result, c.fetchall()
 
-@app.get("/api/stats/game/{game_uuid}")
-async def get_game_details(game_uuid: str):
-    """獲取遊戲詳細記錄"""
-    conn = sqlite3.connect('game_records.db')
-    c = conn.cursor()
-    
+def _query_game_details(c, game_uuid: str):
     # 獲取遊戲基本資訊
     c.execute('''
         SELECT g.game_uuid, g.start_time, g.end_time, 
@@ -1216,10 +1506,8 @@ async def get_game_details(game_uuid: str):
     ''', (game_uuid,))
     
     game_info = c.fetchone()
-    
     if not game_info:
-        conn.close()
-        raise HTTPException(404, "遊戲不存在")
+        return None, [], []
     
     # 獲取參與者
     c.execute('''
@@ -1244,8 +1532,53 @@ async def get_game_details(game_uuid: str):
         ORDER BY timestamp
     ''', (game_uuid,))
     
-    actions = c.fetchall()
-    conn.close()
+    return game_info, participants, c.fetchall()
+
+@app.get("/api/stats/leaderboard")
+async def get_leaderboard(limit: int = 10, offset: int = 0):
+    """獲取排行榜 (由記憶體內排行榜直接提供)"""
+    return {
+        "leaderboard": leaderboard.page(offset, limit),
+        "total": len(leaderboard),
+    }
+
+@app.get("/api/stats/player/{username}")
+async def get_player_stats(username: str):
+    """獲取玩家統計"""
+    result, recent_games = await read_executor.run(_query_player_stats, username)
+    
+    if not result:
+        raise HTTPException(404, "玩家不存在")
+    
+    return {
+        "username": result[0],
+        "nickname": result[1],
+        "total_games": result[2],
+        "total_wins": result[3],
+        "total_losses": result[4],
+        "win_rate": result[5],
+        "is_ai": bool(result[6]),
+        "created_at": result[7],
+        "recent_games": [
+            {
+                "game_id": game[0],
+                "start_time": game[1],
+                "end_time": game[2],
+                "rank": game[3],
+                "eliminated_round": game[4]
+            }
+            for game in recent_games
+        ]
+    }
+
+@app.get("/api/stats/game/{game_uuid}")
+async def get_game_details(game_uuid: str):
+    """獲取遊戲詳細記錄"""
+    game_info, participants, actions = await read_executor.run(
+        _query_game_details, game_uuid)
+    
+    if not game_info:
+        raise HTTPException(404, "遊戲不存在")
     
     return {
         "game_id": game_info[0],
@@ -1280,6 +1613,22 @@ async def get_game_details(game_uuid: str):
         ]
     }
 
+# ===== 監控指標 =====
+@app.get("/api/metrics")
+async def get_metrics():
+    return {
+        "action_journal": action_journal.stats(),
+        "player_id_cache": player_ids.stats(),
+        "websockets": manager.stats(),
+        "lobby_messages_sent": lobby_notifier.messages_sent,
+        "expiry": expiry_scheduler.stats(),
+        "ai_turns": ai_scheduler.stats(),
+        "ai_strategy": strategy_tables.stats(),
+        "game_actors": game_actors.stats(),
+        "cluster": cluster.stats(),
+        "games": games.stats(),
+    }
+
 # ===== API 健康檢查 =====
 @app.get("/")
 async def root():
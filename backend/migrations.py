@@ -0,0 +1,113 @@
+"""game_records.db 的版本化 schema 遷移
+
+目前版本記錄在 PRAGMA user_version；啟動時依序套用尚未執行的遷移，
+每個遷移在自己的交易中執行，失敗時整個遷移會 rollback。
+新增遷移時只需在 MIGRATIONS 後面追加，不要修改已發佈的項目。
+"""
+import sqlite3
+from typing import List, Tuple
+
+Migration = Tuple[int, str, List[str]]
+
+MIGRATIONS: List[Migration] = [
+    (1, "initial schema", [
+        # 玩家表
+        '''
+        CREATE TABLE IF NOT EXISTS players (
+            player_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            nickname VARCHAR(50),
+            is_ai BOOLEAN DEFAULT FALSE,
+            ai_difficulty VARCHAR(20),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_games INTEGER DEFAULT 0,
+            total_wins INTEGER DEFAULT 0,
+            total_losses INTEGER DEFAULT 0,
+            win_rate DECIMAL(5,2) DEFAULT 0.00
+        )
+        ''',
+        # 遊戲記錄表
+        '''
+        CREATE TABLE IF NOT EXISTS games (
+            game_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_uuid VARCHAR(36) UNIQUE NOT NULL,
+            start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            end_time TIMESTAMP,
+            total_rounds INTEGER,
+            winner_id INTEGER,
+            game_duration INTEGER,
+            FOREIGN KEY (winner_id) REFERENCES players(player_id)
+        )
+        ''',
+        # 遊戲參與者表
+        '''
+        CREATE TABLE IF NOT EXISTS game_participants (
+            participant_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_id INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            player_order INTEGER,
+            final_rank INTEGER,
+            eliminated_round INTEGER,
+            total_calls INTEGER DEFAULT 0,
+            pass_used INTEGER DEFAULT 0,
+            reverse_used INTEGER DEFAULT 0,
+            FOREIGN KEY (game_id) REFERENCES games(game_id),
+            FOREIGN KEY (player_id) REFERENCES players(player_id)
+        )
+        ''',
+        # 行動記錄表
+        '''
+        CREATE TABLE IF NOT EXISTS actions (
+            action_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_uuid VARCHAR(36) NOT NULL,
+            round_number INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            action_type VARCHAR(20) NOT NULL,
+            numbers_called TEXT,
+            hit_secret BOOLEAN DEFAULT FALSE,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (2, "secondary indexes for stats and game-end queries", [
+        # get_game_details: WHERE game_uuid = ? ORDER BY timestamp
+        'CREATE INDEX IF NOT EXISTS idx_actions_game_uuid_timestamp '
+        'ON actions (game_uuid, timestamp)',
+        # get_player_stats: JOIN game_participants ON player_id
+        'CREATE INDEX IF NOT EXISTS idx_game_participants_player_game '
+        'ON game_participants (player_id, game_id)',
+        # get_game_details / _update_game_end: WHERE game_id = ? (AND player_id = ?)
+        'CREATE INDEX IF NOT EXISTS idx_game_participants_game_player '
+        'ON game_participants (game_id, player_id)',
+        # get_player_stats: ORDER BY g.start_time DESC
+        'CREATE INDEX IF NOT EXISTS idx_games_start_time '
+        'ON games (start_time)',
+        'ANALYZE',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """套用所有尚未執行的遷移，回傳套用後的版本"""
+    version = current_version(conn)
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[DB] migrated to v{target}: {description}")
+        version = target
+    return version
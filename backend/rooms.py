@@ -0,0 +1,230 @@
+"""房間註冊表
+
+集中管理所有房間，並維護 room_id <-> game_id 的雙向對照，
+遊戲行動時可以 O(1) 找到所屬房間，不必掃描所有房間。
+提供與 dict 相同的基本介面 (rooms[room_id]、in、items() ...)。
+
+任何房間變動 (Room.touch) 或新增 / 刪除房間都會遞增註冊表的 version，
+房間列表的序列化結果與 ETag 都以它為準。
+
+另外維護依 last_activity 排序的次要索引 (全部、各狀態、可加入的房間)，
+query() 依條件挑選最精簡的索引並以 cursor 分頁，房間數量增加時
+每頁的成本只與頁面大小及篩選掉的房間數有關。
+"""
+import bisect
+import uuid
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+Room = Any  # main.Room (避免循環 import)
+ActivityKey = Tuple[float, int]  # (last_activity timestamp, room_id)
+
+
+def _remove_key(keys: List[ActivityKey], key: ActivityKey):
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+def encode_cursor(key: ActivityKey) -> str:
+    return f"{key[0]!r}:{key[1]}"
+
+
+def decode_cursor(cursor: str) -> ActivityKey:
+    ts, room_id = cursor.rsplit(":", 1)
+    return float(ts), int(room_id)
+
+
+class RoomRegistry:
+    def __init__(self, joinable_status=None, expiry=None, idle_timeout: float = 7200):
+        # room.is_joinable() 成立的房間狀態 (WAITING)，查詢此狀態、無密碼且要求空位時改用可加入索引
+        self.joinable_status = joinable_status
+        # 到期排程 (ExpiryScheduler)：以 ("room", room_id) 為 key，
+        # 期限為 last_activity + idle_timeout，沒有玩家的房間立即到期
+        self.expiry = expiry
+        self.idle_timeout = idle_timeout
+        self._rooms: Dict[int, Room] = {}
+        self._game_to_room: Dict[str, int] = {}
+        self.version = 0
+        # 每次啟動不同，避免重啟後沿用舊的 ETag
+        self._epoch = uuid.uuid4().hex[:8]
+        self._listing = None
+        self._listing_version = -1
+        # 次要索引：皆為依 (last_activity, room_id) 遞增排序的串列
+        self._index_entries: Dict[int, Tuple[Any, bool, ActivityKey]] = {}
+        self._by_activity: List[ActivityKey] = []
+        self._by_status: Dict[Any, List[ActivityKey]] = {}
+        self._joinable: List[ActivityKey] = []
+
+    # ----- dict 相容介面 -----
+    def __contains__(self, room_id) -> bool:
+        return room_id in self._rooms
+
+    def __getitem__(self, room_id: int) -> Room:
+        return self._rooms[room_id]
+
+    def __setitem__(self, room_id: int, room: Room):
+        self.add(room_id, room)
+
+    def __delitem__(self, room_id: int):
+        if self.remove(room_id) is None:
+            raise KeyError(room_id)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._rooms)
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def get(self, room_id: int, default=None):
+        return self._rooms.get(room_id, default)
+
+    def keys(self):
+        return self._rooms.keys()
+
+    def values(self):
+        return self._rooms.values()
+
+    def items(self):
+        return self._rooms.items()
+
+    # ----- 房間 / 遊戲對照 -----
+    def add(self, room_id: int, room: Room):
+        if room_id in self._rooms:
+            self.remove(room_id)
+        self._rooms[room_id] = room
+        if room.game_id:
+            self._game_to_room[room.game_id] = room_id
+        room._on_change = self._room_changed
+        self._index(room)
+        self.version += 1
+
+    def remove(self, room_id: int) -> Optional[Room]:
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            room._on_change = None
+            if room.game_id:
+                self._game_to_room.pop(room.game_id, None)
+            self._unindex(room_id)
+            if self.expiry is not None:
+                self.expiry.cancel(("room", room_id))
+            self.version += 1
+        return room
+
+    def _room_changed(self, room: Room):
+        if self._rooms.get(room.room_id) is room:
+            self._unindex(room.room_id)
+            self._index(room)
+        self.version += 1
+
+    # ----- 次要索引 -----
+    def _index(self, room: Room):
+        key = (room.last_activity.timestamp(), room.room_id)
+        joinable = room.is_joinable()
+        self._index_entries[room.room_id] = (room.status, joinable, key)
+        bisect.insort(self._by_activity, key)
+        bisect.insort(self._by_status.setdefault(room.status, []), key)
+        if joinable:
+            bisect.insort(self._joinable, key)
+        if self.expiry is not None:
+            deadline = key[0] + self.idle_timeout if room.players else 0.0
+            self.expiry.schedule(("room", room.room_id), deadline)
+
+    def _unindex(self, room_id: int):
+        entry = self._index_entries.pop(room_id, None)
+        if entry is None:
+            return
+        status, joinable, key = entry
+        _remove_key(self._by_activity, key)
+        _remove_key(self._by_status.get(status, []), key)
+        if joinable:
+            _remove_key(self._joinable, key)
+
+    def joinable_count(self) -> int:
+        return len(self._joinable)
+
+    def query(self, status=None, has_password: Optional[bool] = None,
+              min_free_slots: int = 0, limit: Optional[int] = None,
+              cursor: Optional[str] = None) -> Tuple[List[Room], Optional[str]]:
+        """依 last_activity 由新到舊列出符合條件的房間
+
+        回傳 (rooms, next_cursor)；next_cursor 為 None 代表沒有下一頁。
+        """
+        # 可加入索引不含已滿的房間，只有要求至少一個空位時才能代替狀態索引
+        if (status is not None and status == self.joinable_status and has_password is False
+                and min_free_slots >= 1):
+            keys = self._joinable
+        elif status is not None:
+            keys = self._by_status.get(status, [])
+        else:
+            keys = self._by_activity
+
+        i = len(keys) if cursor is None else bisect.bisect_left(keys, decode_cursor(cursor))
+        result: List[Room] = []
+        last_key = None
+        while i > 0:
+            i -= 1
+            key = keys[i]
+            room = self._rooms[key[1]]
+            if has_password is not None and bool(room.password) != has_password:
+                continue
+            if room.max_players - len(room.players) < min_free_slots:
+                continue
+            if limit is not None and len(result) >= limit:
+                return result, encode_cursor(last_key)
+            result.append(room)
+            last_key = key
+        return result, None
+
+    # ----- 房間列表快取 -----
+    def etag(self, query: str = "") -> str:
+        suffix = f"-{zlib.crc32(query.encode()):08x}" if query else ""
+        return f'W/"rooms-{self._epoch}-{self.version}{suffix}"'
+
+    def cached_listing(self):
+        """目前版本的已序列化房間列表 (沒有則回傳 None)"""
+        return self._listing if self._listing_version == self.version else None
+
+    def store_listing(self, body):
+        self._listing = body
+        self._listing_version = self.version
+
+    def bind_game(self, room_id: int, game_id: str):
+        """房間開始遊戲時建立對照"""
+        room = self._rooms[room_id]
+        if room.game_id:
+            self._game_to_room.pop(room.game_id, None)
+        room.game_id = game_id
+        self._game_to_room[game_id] = room_id
+
+    def unbind_game(self, game_id: str) -> Optional[Room]:
+        """遊戲結束時解除對照，回傳原本所屬的房間"""
+        room_id = self._game_to_room.pop(game_id, None)
+        room = self._rooms.get(room_id) if room_id is not None else None
+        if room is not None and room.game_id == game_id:
+            room.game_id = None
+        return room
+
+    def room_for_game(self, game_id: str) -> Optional[Room]:
+        room_id = self._game_to_room.get(game_id)
+        return self._rooms.get(room_id) if room_id is not None else None
+
+    def check_consistency(self) -> List[str]:
+        """回傳對照表與房間狀態不一致之處 (空串列代表一致)"""
+        problems = []
+        for game_id, room_id in self._game_to_room.items():
+            room = self._rooms.get(room_id)
+            if room is None:
+                problems.append(f"game {game_id} maps to missing room {room_id}")
+            elif room.game_id != game_id:
+                problems.append(f"game {game_id} maps to room {room_id} playing {room.game_id}")
+        for room_id, room in self._rooms.items():
+            if room.game_id and self._game_to_room.get(room.game_id) != room_id:
+                problems.append(f"room {room_id} game {room.game_id} missing from index")
+            expected = (room.status, room.is_joinable(),
+                        (room.last_activity.timestamp(), room_id))
+            if self._index_entries.get(room_id) != expected:
+                problems.append(f"room {room_id} secondary index entry is stale")
+        if len(self._by_activity) != len(self._rooms):
+            problems.append("activity index size does not match room count")
+        return problems
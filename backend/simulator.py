@@ -0,0 +1,126 @@
+"""無 HTTP 的批次遊戲模擬
+
+直接以 GameState 的規則與 AIPlayer 進行 AI 自我對戰，用來離線量測吞吐量與
+調整各難度的策略。SimulatedGame 覆寫 GameState 的持久化與結束處理：
+預設不寫入資料庫、不保留行動記錄，也不碰房間 / 遊戲註冊表；
+persist=True 時沿用一般遊戲的資料庫寫入 (GAME_DB_PATH)。
+
+大量對局以 ProcessPoolExecutor 分批執行，每批回傳勝場統計後在主程序合併。
+import 本模組會 import main (建立 GAME_DB_PATH 的資料表)，
+不需要持久化時請先把 GAME_DB_PATH 指到暫存檔。
+"""
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Optional, Sequence
+
+import main
+from main import GameRuleError, GameState
+from strategy import strategy_tables
+
+DEFAULT_LINEUP = ("easy", "medium", "hard")
+CHUNK_SIZE = 2000
+
+
+class SimulatedGame(GameState):
+    __slots__ = ("persist",)
+    verbose = False
+
+    def __init__(self, players: List[dict], persist: bool = False):
+        self.persist = persist
+        super().__init__(players)
+
+    def _save_game_to_db(self):
+        if self.persist:
+            super()._save_game_to_db()
+
+    def _save_action(self, player_id: int, action_type: str,
+                     numbers: List[int] = None, hit_secret: bool = False):
+        if self.persist:
+            super()._save_action(player_id, action_type, numbers, hit_secret)
+
+    def _on_game_over(self, winner_id: int):
+        if self.persist:
+            self._update_game_end(winner_id)
+
+
+def play_game(lineup: Sequence[str], persist: bool = False) -> int:
+    """依座位順序建立全 AI 對局並下完，回傳勝者的座位"""
+    game = SimulatedGame([{"id": seat, "name": f"{difficulty}_{seat}", "is_ai": True,
+                           "difficulty": difficulty}
+                          for seat, difficulty in enumerate(lineup)], persist=persist)
+    while True:
+        player_id = game.get_current_player().id
+        action = game.decide_ai_action()
+        try:
+            if action is None or action['action'] == 'call':
+                numbers = action['numbers'] if action else [game.number_range[0]]
+                _, game_over = game.call(player_id, numbers)
+                if game_over:
+                    return next(p.id for p in game.players if p.is_alive)
+            elif action['action'] == 'pass':
+                game.use_pass(player_id)
+            else:
+                game.use_reverse(player_id)
+        except GameRuleError:
+            # 決策不合法時 (理論上不會發生) 改喊範圍下限，避免卡住
+            _, game_over = game.call(player_id, [game.number_range[0]])
+            if game_over:
+                return next(p.id for p in game.players if p.is_alive)
+
+
+def run_chunk(n_games: int, lineup: Sequence[str], seed: Optional[int] = None,
+              persist: bool = False) -> dict:
+    """執行 n_games 場對局；每場隨機排座位，消除先手與相對座位 (上下家) 的影響"""
+    if seed is not None:
+        random.seed(seed)
+    strategy_tables.load()
+    wins: Counter = Counter()
+    seats: Counter = Counter()
+    size = len(lineup)
+    for _ in range(n_games):
+        seated = random.sample(lineup, size)
+        for difficulty in seated:
+            seats[difficulty] += 1
+        wins[seated[play_game(seated, persist)]] += 1
+    if persist:
+        main.action_journal.stop()
+    return {"games": n_games, "wins": dict(wins), "seats": dict(seats)}
+
+
+def run_simulation(n_games: int, lineup: Sequence[str] = DEFAULT_LINEUP,
+                   workers: Optional[int] = None, persist: bool = False,
+                   seed: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> dict:
+    """以 ProcessPoolExecutor 平行執行 n_games 場，回傳 games/sec 與各難度勝率"""
+    # 先在主程序建立 / 載入策略表，避免每個 worker 各自重算
+    strategy_tables.load()
+    chunks = [min(chunk_size, n_games - start) for start in range(0, n_games, chunk_size)]
+    seeds = [None if seed is None else seed + i for i in range(len(chunks))]
+
+    start = time.perf_counter()
+    wins: Counter = Counter()
+    seats: Counter = Counter()
+    if workers == 1:
+        results = map(run_chunk, chunks, [lineup] * len(chunks), seeds, [persist] * len(chunks))
+        for result in results:
+            wins.update(result["wins"])
+            seats.update(result["seats"])
+    else:
+        # spawn：worker 不繼承主程序的資料庫連線與背景執行緒
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            for result in pool.map(run_chunk, chunks, [lineup] * len(chunks), seeds,
+                                   [persist] * len(chunks)):
+                wins.update(result["wins"])
+                seats.update(result["seats"])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "games": n_games,
+        "seconds": elapsed,
+        "games_per_sec": n_games / elapsed if elapsed else 0.0,
+        "win_rate": {difficulty: wins[difficulty] / seats[difficulty]
+                     for difficulty in dict.fromkeys(lineup) if seats[difficulty]},
+        "wins": dict(wins),
+    }
@@ -0,0 +1,261 @@
+"""AI 策略表
+
+每回合密碼在目前範圍內均勻分布；沒踩中的號碼會把範圍縮到號碼之外，
+所以已喊過的號碼永遠不在目前範圍內，回合中的狀態只需要：
+  範圍大小 n、存活玩家依出手順序排列的 Pass / 迴轉是否可用、
+  目前是否為反向 (決定下一回合從誰開始)、第幾回合 (決定下一回合的範圍)
+
+對每個狀態以記憶化遞迴求出每位玩家贏得整場遊戲的機率：踩中密碼的玩家出局，
+其餘玩家依座位順序進入下一回合 (範圍與 Pass / 迴轉重置)，
+其價值即下一回合開局狀態的勝率；每位玩家都選擇讓自己勝率最高的行動
+(不考慮提示帶來的資訊)。每個狀態把行動依勝率分組保存 (前 TABLE_TIERS 組)，
+第一次啟動時建立並存成 JSON 快取，之後啟動時直接載入；
+決策只是一次 dict 查詢。
+
+Pass / 迴轉旗標有 4^人數 種組合，表格只涵蓋最多 MAX_PLAYERS 位存活玩家
+(房間最多 10 人)；存活玩家更多時 choose() 回傳 None，AIPlayer 改用簡單策略，
+每種人數第一次發生時記錄一次，次數見 stats()。
+
+行動編碼：call 為 offset * 4 + count (從範圍下限起算 offset，連續喊 count 個)，
+PASS = -1，REVERSE = -2。
+"""
+import json
+import os
+import random
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 快取檔 (不納入版本控制) 預設放在本模組旁，與啟動時的工作目錄無關
+STRATEGY_TABLE_PATH = os.environ.get(
+    "AI_STRATEGY_TABLE_PATH", str(Path(__file__).parent / "ai_strategy_tables.json"))
+# 各回合的號碼範圍大小 (與 GameState._start_round 相同)，第三回合起固定
+ROUND_SIZES = (30, 20, 15)
+MAX_RANGE = max(ROUND_SIZES)
+MAX_PLAYERS = 5
+TABLE_TIERS = 4
+TIER_WIDTH = 3
+# medium 以此機率選最佳的一組行動，其餘時候選次佳的一組
+MEDIUM_ACCURACY = float(os.environ.get("AI_MEDIUM_ACCURACY", "0.7"))
+TABLE_FORMAT = 2
+
+PASS = -1
+REVERSE = -2
+PASS_BIT = 1
+REVERSE_BIT = 2
+
+Flags = Tuple[int, ...]  # 依出手順序 (目前玩家在前) 每位存活玩家的 PASS_BIT | REVERSE_BIT
+Ranked = Tuple[Tuple[float, int], ...]  # (自身勝率, 行動)，由高到低
+
+
+def stage_of(current_round: int) -> int:
+    """回合數對應的 ROUND_SIZES 索引"""
+    return min(current_round, len(ROUND_SIZES)) - 1
+
+
+def _rotate(vector: Sequence[float]) -> Tuple[float, ...]:
+    """下一位玩家視角的向量轉回目前玩家視角"""
+    return (vector[-1],) + tuple(vector[:-1])
+
+
+def _round_value(m: int, stage: int) -> Tuple[float, ...]:
+    """m 位玩家在第 stage 回合開局時，依座位順序 (先手在前) 各自的勝率"""
+    if m == 1:
+        return (1.0,)
+    return _evaluate(ROUND_SIZES[stage], (PASS_BIT | REVERSE_BIT,) * m, False, stage)[0]
+
+
+def _hit_vector(m: int, reverse: bool, stage: int) -> Tuple[float, ...]:
+    """目前玩家踩中密碼時各玩家的勝率：下一回合從出局者座位的下一位開始 (方向重置為正向)"""
+    following = _round_value(m - 1, min(stage + 1, len(ROUND_SIZES) - 1))
+    if reverse:
+        # 反向時出手順序與座位順序相反：座位上的下一位是出手順序的最後一位
+        return (0.0,) + tuple(reversed(following))
+    return (0.0,) + following
+
+
+@lru_cache(maxsize=None)
+def _evaluate(n: int, flags: Flags, reverse: bool, stage: int) -> Tuple[Tuple[float, ...], Ranked]:
+    """回傳 (採用最佳行動時各玩家的勝率, 依自身勝率排序的行動)"""
+    m = len(flags)
+    nxt = flags[1:] + flags[:1]
+    hit = _hit_vector(m, reverse, stage)
+    options: List[Tuple[float, int, int, Tuple[float, ...]]] = []
+
+    for count in range(1, min(3, n) + 1):
+        # offset 與 n - offset - count 對稱，只需計算一半
+        for offset in range((n - count) // 2 + 1):
+            left, right = offset, n - offset - count
+            vector = [count / n * h for h in hit]
+            for size in (left, right):
+                if size:
+                    sub = _rotate(_evaluate(size, nxt, reverse, stage)[0])
+                    for i in range(m):
+                        vector[i] += size / n * sub[i]
+            options.append((vector[0], 0, offset * 4 + count, tuple(vector)))
+            if right != left:
+                options.append((vector[0], 0, right * 4 + count, tuple(vector)))
+
+    if flags[0] & PASS_BIT:
+        after = (flags[0] & ~PASS_BIT,) + flags[1:]
+        vector = _rotate(_evaluate(n, after[1:] + after[:1], reverse, stage)[0])
+        options.append((vector[0], 1, PASS, vector))
+    if flags[0] & REVERSE_BIT:
+        # 反向後出手順序整個倒過來，下一位是原本的最後一位
+        after = ((flags[0] & ~REVERSE_BIT),) + flags[1:]
+        sub = _evaluate(n, tuple(reversed(after)), not reverse, stage)[0]
+        vector = tuple(reversed(sub))
+        options.append((vector[0], 1, REVERSE, vector))
+
+    # 自身勝率相同時優先喊號、保留 Pass / 迴轉
+    options.sort(key=lambda o: (-round(o[0], 12), o[1], o[2]))
+    return options[0][3], tuple((o[0], o[2]) for o in options)
+
+
+def _all_flags(m: int):
+    if m == 0:
+        yield ()
+        return
+    for rest in _all_flags(m - 1):
+        for f in range(4):
+            yield (f,) + rest
+
+
+def _key(n: int, flags: Flags, reverse: bool, stage: int) -> str:
+    return f"{stage}:{int(reverse)}:{n}:{''.join(str(f) for f in flags)}"
+
+
+def state_key(n: int, flags: Flags, reverse: bool = False, stage: int = 0) -> int:
+    """查詢用的整數 key：回合、方向、範圍大小、人數與每人 2 位元的旗標"""
+    key = 0
+    for f in flags:
+        key = key << 2 | f
+    return ((n << 2 | stage) << 1 | reverse) << 13 | len(flags) << 10 | key
+
+
+def _index(tables: Dict[str, List[List[int]]]) -> Dict[int, List[List[int]]]:
+    indexed = {}
+    for text, entry in tables.items():
+        stage, reverse, n, flags = text.split(":")
+        indexed[state_key(int(n), tuple(int(f) for f in flags), reverse == "1", int(stage))] = entry
+    return indexed
+
+
+def _tiers(ranked: Ranked) -> List[List[int]]:
+    """依勝率分組 (同一組的行動勝率相同)，保留前 TABLE_TIERS 組、每組前 TIER_WIDTH 個行動"""
+    tiers: List[List[int]] = []
+    last = None
+    for value, action in ranked:
+        value = round(value, 9)
+        if value != last:
+            if len(tiers) == TABLE_TIERS:
+                break
+            tiers.append([])
+            last = value
+        if len(tiers[-1]) < TIER_WIDTH:
+            tiers[-1].append(action)
+    return tiers
+
+
+def build_tables(max_players: int = MAX_PLAYERS) -> Dict[str, List[List[int]]]:
+    tables = {}
+    for m in range(2, max_players + 1):
+        for flags in _all_flags(m):
+            for stage, size in enumerate(ROUND_SIZES):
+                for reverse in (False, True):
+                    for n in range(1, size + 1):
+                        tables[_key(n, flags, reverse, stage)] = _tiers(_evaluate(n, flags, reverse, stage)[1])
+    _evaluate.cache_clear()
+    return tables
+
+
+class StrategyTables:
+    def __init__(self, path: str = STRATEGY_TABLE_PATH):
+        self.path = path
+        self._tables: Optional[Dict[int, List[List[int]]]] = None
+        # 存活玩家超過 MAX_PLAYERS 而改用簡單策略的次數 / 已記錄過的人數
+        self.fallbacks = 0
+        self._fallback_logged = set()
+
+    @property
+    def loaded(self) -> bool:
+        return self._tables is not None
+
+    def load(self):
+        """從磁碟載入策略表；不存在或格式不符時重新計算並寫回"""
+        if self._tables is not None:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == TABLE_FORMAT and data.get("max_range") == MAX_RANGE:
+                self._tables = _index(data["tables"])
+                print(f"[AI] loaded {len(self._tables)} strategy states from {self.path}")
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+
+        start = time.perf_counter()
+        tables = build_tables()
+        print(f"[AI] built {len(tables)} strategy states in {time.perf_counter() - start:.1f}s")
+        try:
+            # 多個 worker 可能同時建表，各自寫入自己的暫存檔
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"format": TABLE_FORMAT, "max_range": MAX_RANGE, "tables": tables},
+                          f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[AI] could not cache strategy tables: {e}")
+        self._tables = _index(tables)
+
+    def tiers(self, n: int, flags: Flags, reverse: bool = False,
+              stage: int = 0) -> Optional[List[List[int]]]:
+        """狀態下依勝率分組的行動，最佳的一組在前 (超出表格範圍時回傳 None)"""
+        if self._tables is None:
+            self.load()
+        return self._tables.get(state_key(n, flags, reverse, stage))
+
+    def choose(self, difficulty: str, n: int, flags: Flags, reverse: bool = False,
+               stage: int = 0) -> Optional[int]:
+        """依難度挑選行動：hard 取最佳，medium 多半在最佳的一組中隨機、偶爾選次佳，
+        easy 在較差的各組中隨機 (整個狀態只有一組時才會選到最佳)"""
+        if len(flags) > MAX_PLAYERS:
+            self.fallbacks += 1
+            if len(flags) not in self._fallback_logged:
+                self._fallback_logged.add(len(flags))
+                print(f"[AI] {len(flags)} players alive exceeds the strategy table limit "
+                      f"({MAX_PLAYERS}); using the simple strategy")
+            return None
+        tiers = self.tiers(n, flags, reverse, stage)
+        if not tiers:
+            return None
+        if difficulty == "hard":
+            return tiers[0][0]
+        if difficulty == "easy":
+            return random.choice([action for tier in tiers[1:] for action in tier] or tiers[0])
+        if len(tiers) > 1 and random.random() >= MEDIUM_ACCURACY:
+            return random.choice(tiers[1])
+        return random.choice(tiers[0])
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "states": len(self._tables) if self._tables is not None else 0,
+            "max_players": MAX_PLAYERS,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def decode_action(action: int, lower: int) -> dict:
+    """將行動編碼轉回 decide_action 的回傳格式"""
+    if action == PASS:
+        return {'action': 'pass'}
+    if action == REVERSE:
+        return {'action': 'reverse'}
+    offset, count = divmod(action, 4)
+    return {'action': 'call', 'numbers': list(range(lower + offset, lower + offset + count))}
+
+
+strategy_tables = StrategyTables()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# import main 會建立資料表，測試一律使用暫存資料庫與暫存策略表
+_TMP_DIR = tempfile.mkdtemp(prefix="backend_tests_")
+os.environ["GAME_DB_PATH"] = os.path.join(_TMP_DIR, "game_records.db")
+os.environ.setdefault("AI_STRATEGY_TABLE_PATH", os.path.join(_TMP_DIR, "ai_strategy_tables.json"))
@@ -0,0 +1,36 @@
+import asyncio
+
+from connections import ConnectionManager
+
+
+class FakeWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(10)
+
+    async def close(self):
+        pass
+
+
+def test_stop_waits_for_writers_and_clears_connections():
+    async def scenario():
+        manager = ConnectionManager(ping_interval=10)
+        manager.start_heartbeat()
+        sockets = [FakeWebSocket() for _ in range(3)]
+        await manager.connect(sockets[0])
+        for ws in sockets[1:]:
+            await manager.connect(ws, 1)
+        writers = [manager._clients[ws].writer for ws in sockets]
+        await manager.broadcast_room(1, {"type": "room_update"})
+        await asyncio.sleep(0)
+
+        await manager.stop()
+        return manager, writers
+
+    manager, writers = asyncio.run(scenario())
+    assert all(task.done() for task in writers)
+    assert manager.stats()["lobby_connections"] == 0
+    assert manager.stats()["room_connections"] == 0
+    assert manager.stats()["queued_messages"] == 0
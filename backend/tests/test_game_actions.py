@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+import main
+from main import CallNumbersRequest, CreateRoomRequest, HTTPException, JoinRoomRequest
+
+
+async def start_two_player_game() -> str:
+    created = await main.create_room(CreateRoomRequest(player_name="host"))
+    room_id = created["room"]["room_id"]
+    await main.join_room(room_id, JoinRoomRequest(player_name="guest"))
+    return (await main.start_room_game(room_id))["game_id"]
+
+
+def test_commands_queued_behind_the_final_move_are_rejected():
+    async def scenario():
+        game_id = await start_two_player_game()
+        game = main.games.get(game_id)
+        player_id = game.get_current_player().id
+        lower, upper = game.number_range
+        game.secret_number = lower
+        # 兩個請求同時排入 actor：第一個踩中密碼結束遊戲，第二個不應再修改已結束的遊戲
+        return await asyncio.gather(
+            main.call_numbers(CallNumbersRequest(game_id=game_id, player_id=player_id,
+                                                 numbers=[lower])),
+            main.call_numbers(CallNumbersRequest(game_id=game_id, player_id=player_id,
+                                                 numbers=[upper])),
+            return_exceptions=True)
+
+    final, queued = asyncio.run(scenario())
+    assert final["game_over"] is True
+    assert isinstance(queued, HTTPException)
+    assert queued.status_code == 400
+    assert queued.detail == "遊戲已結束"
+
+
+def test_unknown_game_is_not_found():
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(main.call_numbers(CallNumbersRequest(game_id="missing", player_id=1,
+                                                         numbers=[1])))
+    assert e.value.status_code == 404
+
+
+@pytest.mark.parametrize("action", ["call", "pass", "reverse", "ai"])
+def test_socket_action_with_non_string_game_id_is_rejected(action):
+    message = {"type": "game_action", "request_id": "1", "action": action,
+               "game_id": [1], "player_id": 1, "numbers": [1]}
+    ack = asyncio.run(main.handle_game_action(1, message))
+    assert ack["ok"] is False
+    assert ack["status"] == 422
+    assert ack["request_id"] == "1"
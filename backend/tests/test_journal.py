@@ -0,0 +1,102 @@
+import contextlib
+import sqlite3
+import time
+
+from journal import ActionJournal
+
+
+class FlakyDatabase:
+    """前 failures 次交易拋出例外，之後把 executemany 的資料列記下來"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.rows = []
+
+    @contextlib.contextmanager
+    def transaction(self):
+        db = self
+
+        class Cursor:
+            def executemany(self, sql, rows):
+                if db.failures > 0:
+                    db.failures -= 1
+                    raise sqlite3.OperationalError("database is locked")
+                db.rows.extend(rows)
+
+        yield Cursor()
+
+
+def row(i):
+    return ("game", 1, i, "call", "[1]", False, "2024-01-01T00:00:00")
+
+
+def make_journal(db, **kwargs):
+    return ActionJournal(db, flush_interval_ms=1, retry_backoff_ms=1, **kwargs)
+
+
+def test_failed_flush_is_retried_until_written():
+    db = FlakyDatabase(failures=2)
+    journal = make_journal(db, retries=3)
+    for i in range(5):
+        journal.append(row(i))
+    assert journal.flush(wait=True, timeout=5)
+
+    assert db.rows == [row(i) for i in range(5)]
+    stats = journal.stats()
+    assert stats["retried"] == 2
+    assert stats["rows_written"] == 5
+    assert stats["rows_pending"] == 0
+    assert "database is locked" in stats["last_error"]
+    journal.stop()
+
+
+def test_rows_survive_exhausted_retries_and_are_written_with_the_next_batch():
+    db = FlakyDatabase(failures=2)
+    journal = make_journal(db, retries=1, retry_interval_ms=60000)
+    journal.append(row(0))
+    assert journal.flush(wait=True, timeout=5)
+    assert db.rows == []
+    assert journal.stats()["failed_batches"] == 1
+    assert journal.stats()["rows_pending"] == 1
+
+    journal.append(row(1))
+    assert journal.flush(wait=True, timeout=5)
+    assert db.rows == [row(0), row(1)]
+    assert journal.stats()["rows_pending"] == 0
+    assert journal.stats()["rows_dropped"] == 0
+    journal.stop()
+
+
+def test_pending_rows_are_retried_without_new_actions():
+    db = FlakyDatabase(failures=2)
+    journal = make_journal(db, retries=1, retry_interval_ms=10)
+    journal.append(row(0))
+    assert journal.flush(wait=True, timeout=5)
+    deadline = time.monotonic() + 5
+    while not db.rows and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert db.rows == [row(0)]
+    journal.stop()
+
+
+def test_rows_still_failing_at_stop_are_reported_as_dropped():
+    db = FlakyDatabase(failures=10)
+    journal = make_journal(db, retries=1, retry_interval_ms=60000)
+    journal.append(row(0))
+    journal.stop()
+    assert db.rows == []
+    assert journal.stats()["rows_dropped"] == 1
+
+
+def test_rows_beyond_max_pending_are_reported_as_dropped(capsys):
+    db = FlakyDatabase(failures=1)
+    journal = make_journal(db, retries=0, max_pending=2, retry_interval_ms=60000)
+    for i in range(3):
+        journal.append(row(i))
+    assert journal.flush(wait=True, timeout=5)
+    stats = journal.stats()
+    assert stats["rows_dropped"] == 1
+    assert stats["rows_pending"] == 2
+    assert "dropped 1" in capsys.readouterr().out
+    journal.stop()
+    assert db.rows == [row(1), row(2)]
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from main import Player, Room, RoomStatus
+from rooms import RoomRegistry
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def registry():
+    return RoomRegistry(joinable_status=RoomStatus.WAITING)
+
+
+def make_room(registry, room_id, minutes=0, players=1, password=None, max_players=5):
+    room = Room(room_id)
+    room.max_players = max_players
+    room.password = password
+    for i in range(players):
+        room.add_player(Player(id=room_id * 100 + i, name=f"p{i}"))
+    room.last_activity = BASE_TIME + timedelta(minutes=minutes)
+    registry[room_id] = room
+    return room
+
+
+def ids(rooms):
+    return [room.room_id for room in rooms]
+
+
+def test_add_and_remove_keep_indexes_consistent(registry):
+    for room_id in range(1, 6):
+        make_room(registry, room_id, minutes=room_id)
+    assert len(registry) == 5
+    assert registry.joinable_count() == 5
+    assert registry.check_consistency() == []
+
+    del registry[3]
+    assert 3 not in registry
+    assert ids(registry.query()[0]) == [5, 4, 2, 1]
+    assert registry.joinable_count() == 4
+    assert registry.check_consistency() == []
+    with pytest.raises(KeyError):
+        del registry[3]
+
+
+def test_status_change_moves_room_between_indexes(registry):
+    room = make_room(registry, 1)
+    make_room(registry, 2, minutes=1)
+    room.status = RoomStatus.PLAYING
+
+    assert ids(registry.query(status=RoomStatus.PLAYING)[0]) == [1]
+    assert ids(registry.query(status=RoomStatus.WAITING)[0]) == [2]
+    assert registry.joinable_count() == 1
+    assert registry.check_consistency() == []
+
+
+def test_activity_change_reorders_listing(registry):
+    first = make_room(registry, 1)
+    make_room(registry, 2, minutes=1)
+    first.last_activity = BASE_TIME + timedelta(minutes=2)
+
+    assert ids(registry.query()[0]) == [1, 2]
+    assert registry.check_consistency() == []
+
+
+def test_cursor_pagination_visits_every_room_once(registry):
+    for room_id in range(1, 8):
+        make_room(registry, room_id, minutes=room_id)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = registry.query(limit=3, cursor=cursor)
+        seen.extend(ids(page))
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_waiting_query_without_free_slots_includes_full_rooms(registry):
+    full = make_room(registry, 1, players=2, max_players=2)
+    full.status = RoomStatus.WAITING
+    make_room(registry, 2, minutes=1)
+    make_room(registry, 3, minutes=2, password="secret")
+
+    rooms, _ = registry.query(status=RoomStatus.WAITING, has_password=False)
+    assert ids(rooms) == [2, 1]
+    rooms, _ = registry.query(status=RoomStatus.WAITING, has_password=False, min_free_slots=1)
+    assert ids(rooms) == [2]
+    assert registry.check_consistency() == []
+
+
+def test_game_binding(registry):
+    make_room(registry, 1)
+    registry.bind_game(1, "g1")
+    assert registry.room_for_game("g1").room_id == 1
+    assert registry.check_consistency() == []
+
+    assert registry.unbind_game("g1").room_id == 1
+    assert registry.room_for_game("g1") is None
+    assert registry[1].game_id is None
+    assert registry.check_consistency() == []
@@ -0,0 +1,33 @@
+import board
+from main import AIPlayer
+from strategy import MAX_PLAYERS, PASS_BIT, REVERSE_BIT, StrategyTables, strategy_tables
+
+FULL = PASS_BIT | REVERSE_BIT
+
+
+def test_choose_above_player_cap_falls_back_and_logs_once(tmp_path, capsys):
+    tables = StrategyTables(str(tmp_path / "tables.json"))
+    flags = (FULL,) * (MAX_PLAYERS + 1)
+
+    assert tables.choose("hard", 30, flags) is None
+    assert tables.choose("easy", 12, flags) is None
+    # 超出上限時不需要載入 (或建立) 策略表
+    assert not tables.loaded
+    assert tables.stats()["fallbacks"] == 2
+    assert capsys.readouterr().out.count("exceeds the strategy table limit") == 1
+
+
+def test_ai_with_more_alive_players_than_the_cap_uses_simple_strategy():
+    players = [{"id": i, "is_alive": True, "pass_available": True, "reverse_available": True}
+               for i in range(10)]
+    game_state = {"number_range": (1, 30), "called_numbers": [], "players": players,
+                  "direction": 1, "current_round": 1}
+    available = board.available_mask(1, 30, 0)
+    fallbacks = strategy_tables.fallbacks
+
+    for difficulty in ("easy", "medium", "hard"):
+        decision = AIPlayer(0, difficulty).decide_action(game_state, available, True, True)
+        assert decision["action"] in ("call", "pass")
+        if decision["action"] == "call":
+            assert board.mask_of(decision["numbers"]) & ~available == 0
+    assert strategy_tables.fallbacks == fallbacks + 3
@@ -0,0 +1,36 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_bad_message_does_not_kill_the_connection_and_disconnect_cleans_up(monkeypatch):
+    route = main.route_client_message
+    calls = []
+
+    async def flaky_route(room_id, data):
+        calls.append(data)
+        if len(calls) == 1:
+            raise TypeError("boom")
+        return await route(room_id, data)
+
+    monkeypatch.setattr(main, "route_client_message", flaky_route)
+    client = TestClient(main.app)
+    with client.websocket_connect("/ws/room_424242") as ws:
+        ws.send_text("{}")
+        ws.send_text(json.dumps({"type": "game_action", "request_id": "2",
+                                 "action": "ai", "game_id": "missing"}))
+        ack = ws.receive_json()
+        assert ack["request_id"] == "2"
+        assert ack["status"] == 404
+    assert len(calls) == 2
+    assert main.manager.stats()["room_connections"] == 0
+
+
+def test_snapshot_request_with_non_string_game_id_gets_an_error_reply():
+    for game_id in ([1], {"id": 1}):
+        data = json.dumps({"type": "game_snapshot_request", "game_id": game_id})
+        reply = asyncio.run(main.handle_client_message(1, data))
+        assert reply["type"] == "error"
@@ -0,0 +1,109 @@
+"""
+比較 AI 每回合決策的吞吐量：
+  legacy  - 舊做法，set(range(lo, hi + 1)) - called 算出可用號碼，
+            再排序成串列逐段檢查連續號碼
+  fallback - 相同的簡單策略改用位元遮罩 (AIPlayer._simple_action)，
+             只比較號碼盤表示法的差異
+  bitmask  - backend/main.py 目前的 get_ai_action 熱路徑：
+             board.available_mask() + AIPlayer.decide_action() (查詢策略表)
+
+狀態為隨機產生的回合中局面 (範圍、已喊號碼、存活玩家與 Pass / 迴轉)。
+策略表會放在暫存目錄，第一次執行需要計算約半分鐘 (不計入量測)。
+
+用法: python scripts/bench_ai_decisions.py [決策次數]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="bench_ai_")
+os.environ["GAME_DB_PATH"] = os.path.join(TMP_DIR, "game_records.db")
+os.environ.setdefault("AI_STRATEGY_TABLE_PATH", os.path.join(TMP_DIR, "ai_strategy_tables.json"))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import board  # noqa: E402
+import main  # noqa: E402  (會在暫存資料庫上建立資料表)
+from strategy import strategy_tables  # noqa: E402
+
+
+def legacy_decide(game_state, available_numbers, pass_available):
+    danger = len(game_state['called_numbers']) / \
+             (game_state['number_range'][1] - game_state['number_range'][0] + 1)
+    if danger > 0.75 and pass_available and random.random() < 0.6:
+        return {'action': 'pass'}
+    available_list = sorted(list(available_numbers))
+    if not available_list:
+        return {'action': 'pass'} if pass_available else None
+    count = random.randint(1, min(3, len(available_list)))
+    for i in range(len(available_list) - count + 1):
+        group = available_list[i:i+count]
+        if all(group[j+1] - group[j] == 1 for j in range(len(group)-1)):
+            return {'action': 'call', 'numbers': group}
+    return {'action': 'call', 'numbers': [available_list[0]]}
+
+
+def random_state():
+    lower = random.randint(1, 30)
+    upper = random.randint(lower, 30)
+    called = set(random.sample(range(1, lower), random.randint(0, lower - 1)))
+    called |= set(random.sample(range(upper + 1, 31), random.randint(0, 30 - upper)))
+    players = [{"id": i, "is_alive": i < 2 or random.random() < 0.7,
+                "pass_available": random.random() < 0.5,
+                "reverse_available": random.random() < 0.5} for i in range(5)]
+    # 兩種表示法各自保存的已喊號碼 (set / 位元遮罩)
+    return lower, upper, called, board.mask_of(called), players
+
+
+def bench(label, decide, states):
+    start = time.perf_counter()
+    for state in states:
+        decide(state)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {len(states) / elapsed:>10,.0f} decisions/s "
+          f"({elapsed / len(states) * 1e6:.2f}us each)")
+
+
+def main_bench(n):
+    strategy_tables.load()
+    states = [random_state() for _ in range(n)]
+
+    def legacy(state):
+        lower, upper, called, _, players = state
+        available = set(range(lower, upper + 1)) - called
+        game_state = {'number_range': (lower, upper), 'called_numbers': list(called),
+                      'players': players}
+        legacy_decide(game_state, available, players[0]['pass_available'])
+
+    def current(difficulty):
+        ai = main.AIPlayer(0, difficulty)
+
+        def run(state):
+            lower, upper, _, called_mask, players = state
+            available = board.available_mask(lower, upper, called_mask)
+            game_state = {'number_range': (lower, upper),
+                          'called_numbers': board.numbers_of(called_mask),
+                          'players': players, 'direction': 1}
+            ai.decide_action(game_state, available, players[0]['pass_available'],
+                             players[0]['reverse_available'])
+        return run
+
+    def fallback(state):
+        lower, upper, _, called_mask, players = state
+        available = board.available_mask(lower, upper, called_mask)
+        game_state = {'number_range': (lower, upper),
+                      'called_numbers': board.numbers_of(called_mask), 'players': players}
+        simple_ai._simple_action(game_state, available, players[0]['pass_available'])
+
+    simple_ai = main.AIPlayer(0, "medium")
+    bench("legacy", legacy, states)
+    bench("fallback", fallback, states)
+    for difficulty in ("easy", "medium", "hard"):
+        bench(f"bitmask/{difficulty}", current(difficulty), states)
+
+
+if __name__ == "__main__":
+    main_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
+    main.action_journal.stop()
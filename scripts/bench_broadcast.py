@@ -0,0 +1,121 @@
+"""
+比較大廳廣播的扇出延遲：
+  legacy     - 逐一 await send_json()，每條連線各自序列化一次
+  queued     - backend/connections.py：序列化一次後放進每條連線的送出佇列，
+               由各自的 writer 送出，含逾時與剔除
+               (broadcast 為廣播呼叫本身的耗時，delivered 為所有正常客戶端都收到的耗時)
+
+用假的 WebSocket 模擬 1k / 10k 條大廳連線，每次送出耗時 SEND_LATENCY 秒；
+另外放入少量卡住不回應的「慢速客戶端」，觀察它們對其他人的影響。
+最後以一個跟不上的客戶端連續收 BURST 則廣播，比較 drop_oldest 與 disconnect。
+
+用法: python scripts/bench_broadcast.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from connections import ConnectionManager  # noqa: E402
+
+SEND_LATENCY = 0.0005
+SLOW_CLIENTS = 3
+SLOW_LATENCY = 5.0
+BURST = 1000
+LAGGING_LATENCY = 0.001
+
+MESSAGE = {
+    "type": "rooms_updated",
+    "rooms": [
+        {"room_id": 100000 + i, "name": "快樂的老虎", "status": "waiting",
+         "player_count": 3, "max_players": 5, "has_password": False}
+        for i in range(20)
+    ],
+}
+
+
+class FakeWebSocket:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+
+    async def send_json(self, data: dict):
+        # 與 Starlette 的 WebSocket.send_json 相同：每次呼叫都重新序列化
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def close(self):
+        pass
+
+
+def make_sockets(n: int, slow: int):
+    return [FakeWebSocket(SLOW_LATENCY if i < slow else SEND_LATENCY) for i in range(n)]
+
+
+async def legacy_broadcast(connections, message):
+    for connection in connections:
+        try:
+            await connection.send_json(message)
+        except Exception:
+            pass
+
+
+async def bench(n: int, slow: int):
+    sockets = make_sockets(n, slow)
+    t0 = time.perf_counter()
+    await legacy_broadcast(sockets, MESSAGE)
+    legacy = time.perf_counter() - t0
+
+    manager = ConnectionManager(send_timeout=0.5)
+    sockets = make_sockets(n, slow)
+    for ws in sockets:
+        await manager.connect(ws)
+    t0 = time.perf_counter()
+    await manager.broadcast_lobby(MESSAGE)
+    broadcast = time.perf_counter() - t0
+    while any(ws.sent == 0 for ws in sockets[slow:]):
+        await asyncio.sleep(0.0005)
+    delivered = time.perf_counter() - t0
+    await asyncio.sleep(manager.send_timeout + 0.1)
+
+    print(f"{n:>6} sockets, {slow} slow: legacy={legacy * 1000:9.1f}ms "
+          f"broadcast={broadcast * 1000:6.1f}ms delivered={delivered * 1000:7.1f}ms "
+          f"evicted={manager.evicted} remaining={len(manager.lobby_connections)}")
+    await manager.stop()
+
+
+async def bench_lagging(policy: str):
+    """一個每則需要 LAGGING_LATENCY 秒的客戶端，連續收 BURST 則廣播"""
+    manager = ConnectionManager(queue_max=64, overflow_policy=policy)
+    lagging = FakeWebSocket(LAGGING_LATENCY)
+    await manager.connect(lagging)
+    for i in range(BURST):
+        await manager.broadcast_lobby({"type": "rooms_updated", "seq": i})
+    depth = manager.stats()["max_queue_depth_now"]
+    await asyncio.sleep(0.2)
+    stats = manager.stats()
+    print(f"lagging client, {policy:<11}: depth after burst={depth:>3} "
+          f"dropped={stats['dropped_messages']:>4} evictions={stats['evictions']}")
+    await manager.stop()
+
+
+async def main_bench():
+    for n in (1_000, 10_000):
+        await bench(n, 0)
+        await bench(n, SLOW_CLIENTS)
+    for policy in ("drop_oldest", "disconnect"):
+        await bench_lagging(policy)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_bench())
@@ -0,0 +1,85 @@
+"""
+比較每次行動寫入資料庫的延遲：
+  before - 舊做法，每次 sqlite3.connect() / commit / close
+  after  - GameState._save_action 目前的熱路徑 (放入 write-behind 佇列，
+           由背景執行緒透過 backend/db.py 連線池批次寫入)
+
+用法: python scripts/bench_db_actions.py [次數]
+"""
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="bench_db_")
+os.environ["GAME_DB_PATH"] = os.path.join(TMP_DIR, "game_records.db")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import main  # noqa: E402  (會在暫存資料庫上建立資料表)
+
+
+def legacy_save_action(path, game_id, round_number, player_id, numbers):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute('''
+        INSERT INTO actions
+        (game_uuid, round_number, player_id, action_type,
+         numbers_called, hit_secret)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (game_id, round_number, player_id, 'call', json.dumps(numbers), False))
+    conn.commit()
+    conn.close()
+
+
+def report(label, samples):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(f"{label:<8} mean={statistics.mean(samples_ms):.3f}ms "
+          f"p50={statistics.median(samples_ms):.3f}ms p95={p95:.3f}ms")
+
+
+def main_bench(n):
+    legacy_path = os.path.join(TMP_DIR, "legacy.db")
+    conn = sqlite3.connect(legacy_path)
+    conn.execute('''
+        CREATE TABLE actions (
+            action_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_uuid VARCHAR(36) NOT NULL,
+            round_number INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            action_type VARCHAR(20) NOT NULL,
+            numbers_called TEXT,
+            hit_secret BOOLEAN DEFAULT FALSE,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.close()
+
+    game = main.GameState([{"id": 1, "name": "A"}, {"id": 2, "name": "B"}])
+
+    before = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        legacy_save_action(legacy_path, game.game_id, 1, 1, [1, 2])
+        before.append(time.perf_counter() - t0)
+
+    after = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        game._save_action(1, 'call', [1, 2], False)
+        after.append(time.perf_counter() - t0)
+
+    main.action_journal.stop()
+
+    print(f"{n} actions per run")
+    report("before", before)
+    report("after", after)
+    print(f"journal  {main.action_journal.stats()}")
+
+
+if __name__ == "__main__":
+    main_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
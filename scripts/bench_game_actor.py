@@ -0,0 +1,168 @@
+"""
+比較同一場遊戲在大量並發請求下的行動處理：
+  legacy - 舊的端點：直接修改 GameState 後 await 房間廣播，每個請求各廣播一次
+  actor  - backend/actors.py：每場遊戲一個指令佇列，整批執行後只廣播一次，
+           廣播依批次順序送出，不阻擋下一批
+
+每位玩家各自輪詢，輪到自己時同時送出 CLIENTS 個相同的喊號 (模擬重送與多分頁)；
+房間內有 SPECTATORS 條假的 WebSocket，每次送出耗時 SEND_LATENCY 秒；
+廣播與多 worker 部署相同，先經過一次 PUBLISH_LATENCY 秒的 cluster 發佈。
+「stale」為回應送出前遊戲已被其他請求改掉 (回應內容與剛執行完時不符) 的次數；
+「seq gaps」為客戶端收到的 game_delta seq 不連續 (需要重新要求快照) 的次數。
+
+用法: python scripts/bench_game_actor.py [遊戲數]
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+os.environ.setdefault("GAME_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench_actor_"),
+                                                   "game_records.db"))
+
+import main  # noqa: E402
+from main import (CallNumbersRequest, CreateRoomRequest, GameRuleError,  # noqa: E402
+                  HTTPException, JoinRoomRequest)
+
+CLIENTS = 8
+SPECTATORS = 20
+SEND_LATENCY = 0.002
+PUBLISH_LATENCY = 0.001
+MOVES_PER_GAME = 12
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = 0
+        self.seq = {}
+        self.gaps = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(SEND_LATENCY)
+        self.sent += 1
+        delta = json.loads(text).get("game_delta")
+        if delta is not None:
+            last = self.seq.get(delta["game_id"])
+            if last is not None and delta["seq"] != last + 1:
+                self.gaps += 1
+            self.seq[delta["game_id"]] = delta["seq"]
+
+    async def close(self):
+        pass
+
+
+stale = [0]
+
+
+async def publish(room_id, text):
+    """模擬 cluster.publish：送到其他 worker 需要一次 Unix socket 往返"""
+    await asyncio.sleep(PUBLISH_LATENCY)
+    if room_id is None:
+        await main.manager.deliver_lobby(text)
+    else:
+        await main.manager.deliver_room(room_id, text)
+
+
+async def legacy_call(request: CallNumbersRequest):
+    """舊版 /api/game/call：修改後 await 廣播，再讀取 (可能已被改掉的) 狀態"""
+    game = main.games.get(request.game_id)
+    print(f"Call Request: player={request.player_id}, "
+          f"current_player_id={game.get_current_player().id}, numbers={request.numbers}")
+    try:
+        hit_secret, game_over = game.call(request.player_id, request.numbers)
+    except GameRuleError as e:
+        print(f"Call Rejected: {e}")
+        raise
+    expected = game.players[game.current_player_index].id
+    main.schedule_ai_turn(game)
+    await main.notify_game_update(game)
+    if not game_over and game.players[game.current_player_index].id != expected:
+        stale[0] += 1
+
+
+async def actor_call(request: CallNumbersRequest):
+    await main.call_numbers(request)
+
+
+async def setup_games(n_games: int):
+    sockets = []
+    game_ids = []
+    for i in range(n_games):
+        created = await main.create_room(CreateRoomRequest(player_name=f"host{i}"))
+        room_id = created["room"]["room_id"]
+        for name in ("b", "c"):
+            await main.join_room(room_id, JoinRoomRequest(player_name=f"{name}{i}"))
+        for _ in range(SPECTATORS):
+            ws = FakeWebSocket()
+            await main.manager.connect(ws, room_id)
+            sockets.append(ws)
+        game_ids.append((await main.start_room_game(room_id))["game_id"])
+    return game_ids, sockets
+
+
+async def player(game_id: str, player_id: int, call, totals: dict):
+    """輪到自己時送出 CLIENTS 個相同的喊號，直到遊戲結束或出局"""
+    while totals["moves"] < MOVES_PER_GAME:
+        game = main.games.get(game_id)
+        if game is None or not any(p.id == player_id and p.is_alive for p in game.players):
+            return
+        if game.get_current_player().id != player_id:
+            await asyncio.sleep(0)
+            continue
+        request = CallNumbersRequest(game_id=game_id, player_id=player_id,
+                                     numbers=[game.number_range[0]])
+        results = await asyncio.gather(*(call(request) for _ in range(CLIENTS)),
+                                       return_exceptions=True)
+        accepted = sum(1 for r in results if not isinstance(r, (GameRuleError, HTTPException)))
+        totals["requests"] += len(results)
+        totals["accepted"] += accepted
+        totals["moves"] += accepted
+
+
+async def play(game_id: str, call, totals: dict):
+    game_totals = {"moves": 0, "requests": 0, "accepted": 0}
+    await asyncio.gather(*(player(game_id, p.id, call, game_totals)
+                           for p in main.games.get(game_id).players))
+    totals["requests"] += game_totals["requests"]
+    totals["accepted"] += game_totals["accepted"]
+
+
+async def run(label: str, call, n_games: int):
+    game_ids, sockets = await setup_games(n_games)
+    stale[0] = 0
+    totals = {"requests": 0, "accepted": 0}
+    start = time.perf_counter()
+    # 兩種模式都有相同的逐請求 print，計時期間丟棄輸出
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(play(g, call, totals) for g in game_ids))
+    elapsed = time.perf_counter() - start
+    while main.manager.stats()["queued_messages"]:
+        await asyncio.sleep(0.01)
+    sent = sum(ws.sent for ws in sockets)
+    print(f"{label:<8}{totals['requests']:>9}{totals['accepted']:>9}"
+          f"{sent / len(sockets):>12.1f}{stale[0]:>7}{sum(ws.gaps for ws in sockets):>10}"
+          f"{elapsed:>8.2f}s")
+
+
+async def bench(n_games: int):
+    main.GameState.verbose = False
+    main.manager.publish = publish
+    print(f"{'mode':<8}{'requests':>9}{'accepted':>9}{'msgs/socket':>12}"
+          f"{'stale':>7}{'seq gaps':>10}{'time':>9}")
+    await run("legacy", legacy_call, n_games)
+    await run("actor", actor_call, n_games)
+    print(f"actors: {main.game_actors.stats()}")
+    await main.manager.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
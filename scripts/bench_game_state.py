@@ -0,0 +1,120 @@
+"""
+比較遊戲狀態在熱路徑上的成本：
+  legacy  - 舊做法，玩家為 pydantic Player 模型、GameState 使用一般 __dict__，
+            每次序列化都呼叫 p.dict()
+  slotted - backend/main.py 目前的 GamePlayer / GameState (__slots__，to_dict())
+
+每一步 (move) 模擬一次行動：修改目前玩家的旗標，再產生一次狀態 (status) 與
+廣播用欄位 (_public_fields)。記憶體以 tracemalloc 量測建立 N 場遊戲的增量。
+
+用法: python scripts/bench_game_state.py [場數]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="bench_state_")
+os.environ["GAME_DB_PATH"] = os.path.join(TMP_DIR, "game_records.db")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import main  # noqa: E402  (會在暫存資料庫上建立資料表)
+
+warnings.simplefilter("ignore")  # pydantic v2 對 .dict() 的棄用警告
+
+MOVES = 20000
+PLAYERS = [{"name": f"p{i}", "is_ai": i > 0} for i in range(5)]
+
+
+class LegacyGame:
+    """舊版 GameState 的資料表示法 (無 __slots__，玩家為 pydantic 模型)"""
+
+    def __init__(self, template):
+        for name in main.GameState.__slots__:
+            setattr(self, name, getattr(template, name))
+        self.called_numbers = set(template.called_numbers)
+        self.players = [main.Player(id=p.id, name=p.name, is_ai=p.is_ai)
+                        for p in template.players]
+
+    def status(self):
+        alive_players = [p for p in self.players if p.is_alive]
+        game_over = len(alive_players) <= 1
+        return {
+            "game_id": self.game_id,
+            "current_round": self.current_round,
+            "current_player": self.players[self.current_player_index].id,
+            "number_range": list(self.number_range),
+            "called_numbers": list(self.called_numbers),
+            "players": [p.dict() for p in self.players],
+            "direction": self.direction,
+            "game_over": game_over,
+            "winner": alive_players[0].id if game_over else None,
+            "hints": self.hints,
+        }
+
+    def public_fields(self):
+        return {
+            "current_round": self.current_round,
+            "current_player": self.players[self.current_player_index].id,
+            "number_range": list(self.number_range),
+            "called_numbers": sorted(self.called_numbers),
+            "players": [p.dict() for p in self.players],
+            "direction": self.direction,
+            "game_over": sum(1 for p in self.players if p.is_alive) <= 1,
+            "hints": self.hints,
+        }
+
+
+def clone_slotted(template):
+    game = object.__new__(main.GameState)
+    for name in main.GameState.__slots__:
+        setattr(game, name, getattr(template, name))
+    game.players = [main.GamePlayer(id=p.id, name=p.name, is_ai=p.is_ai)
+                    for p in template.players]
+    return game
+
+
+def run_moves(game, status, public_fields):
+    players = game.players
+    start = time.perf_counter()
+    for i in range(MOVES):
+        player = players[i % len(players)]
+        player.pass_available = not player.pass_available
+        player.reverse_available = not player.reverse_available
+        status()
+        public_fields()
+    return (time.perf_counter() - start) / MOVES
+
+
+def measure_memory(factory, n):
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    games = [factory() for _ in range(n)]
+    size = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(base, "filename"))
+    tracemalloc.stop()
+    del games
+    return size / n
+
+
+def main_bench(n_games):
+    template = main.GameState(PLAYERS)
+    legacy = LegacyGame(template)
+    slotted = clone_slotted(template)
+
+    legacy_move = run_moves(legacy, legacy.status, legacy.public_fields)
+    slotted_move = run_moves(slotted, slotted.status, slotted._public_fields)
+    print(f"per move   legacy={legacy_move * 1e6:.2f}us "
+          f"slotted={slotted_move * 1e6:.2f}us ({legacy_move / slotted_move:.1f}x)")
+
+    legacy_mem = measure_memory(lambda: LegacyGame(template), n_games)
+    slotted_mem = measure_memory(lambda: clone_slotted(template), n_games)
+    print(f"per game   legacy={legacy_mem:.0f}B slotted={slotted_mem:.0f}B "
+          f"({legacy_mem / slotted_mem:.1f}x)  [{n_games} games, players + game object]")
+
+
+if __name__ == "__main__":
+    main_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
+    main.action_journal.stop()
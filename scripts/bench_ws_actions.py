@@ -0,0 +1,125 @@
+"""
+比較每一步行動的延遲 (真實的 uvicorn 伺服器，localhost)：
+  http - 舊的前端流程：POST /api/game/call 後再 GET /api/game/status 取得新狀態
+  ws   - 房間 WebSocket 上的 game_action，等待 game_action_ack
+         (room_update 的 game_delta 在 ack 之前送達，不需要再查詢狀態)
+
+房間內兩位真人玩家輪流喊範圍下限，遊戲結束後自動開新局。
+
+用法: python scripts/bench_ws_actions.py [每種方式的行動數]
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = {**os.environ,
+           "GAME_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="bench_ws_"), "game_records.db")}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(client: httpx.AsyncClient):
+    for _ in range(300):
+        try:
+            if (await client.get("/api/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def new_game(client: httpx.AsyncClient, room_id: int) -> str:
+    return (await client.post(f"/api/rooms/{room_id}/start")).json()["game_id"]
+
+
+async def bench_http(client: httpx.AsyncClient, room_id: int, n: int):
+    game_id = await new_game(client, room_id)
+    state = (await client.get("/api/game/status", params={"game_id": game_id})).json()
+    latencies = []
+    for _ in range(n):
+        if state["game_over"]:
+            game_id = await new_game(client, room_id)
+            state = (await client.get("/api/game/status", params={"game_id": game_id})).json()
+        start = time.perf_counter()
+        await client.post("/api/game/call", json={
+            "game_id": game_id, "player_id": state["current_player"],
+            "numbers": [state["number_range"][0]]})
+        state = (await client.get("/api/game/status", params={"game_id": game_id})).json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def bench_ws(client: httpx.AsyncClient, ws, room_id: int, n: int):
+    game_id = await new_game(client, room_id)
+    state = (await client.get("/api/game/status", params={"game_id": game_id})).json()
+    latencies = []
+    for i in range(n):
+        if state["game_over"]:
+            game_id = await new_game(client, room_id)
+            state = (await client.get("/api/game/status", params={"game_id": game_id})).json()
+        start = time.perf_counter()
+        await ws.send(json.dumps({
+            "type": "game_action", "request_id": str(i), "action": "call", "game_id": game_id,
+            "player_id": state["current_player"], "numbers": [state["number_range"][0]]}))
+        while True:
+            message = json.loads(await ws.recv())
+            delta = message.get("game_delta")
+            if delta is not None and delta["game_id"] == game_id:
+                state.update(delta["changes"])
+            if message["type"] == "game_action_ack" and message["request_id"] == str(i):
+                break
+        latencies.append(time.perf_counter() - start)
+        if message["ok"] and message["result"].get("game_over"):
+            state["game_over"] = True
+    return latencies
+
+
+def report(label: str, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<6}{len(latencies):>8}{p50:>10.2f}ms{p99:>10.2f}ms")
+
+
+async def bench(n: int):
+    port = free_port()
+    server = start_server(port)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            await wait_ready(client)
+            room_id = (await client.post("/api/rooms/create",
+                                         json={"player_name": "a"})).json()["room"]["room_id"]
+            await client.post(f"/api/rooms/{room_id}/join", json={"player_name": "b"})
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws/room_{room_id}") as ws:
+                print(f"{'mode':<6}{'moves':>8}{'p50':>12}{'p99':>12}")
+                report("http", await bench_http(client, room_id, n))
+                report("ws", await bench_ws(client, ws, room_id, n))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,119 @@
+"""
+查詢計畫回歸檢查
+
+在暫存資料庫上建立大量合成資料 (預設 1,000,000 筆 actions)，
+實際執行 backend/main.py 中的統計查詢與遊戲寫入路徑，擷取它們送出的 SQL，
+再以 EXPLAIN QUERY PLAN 確認沒有任何一條退化成全表掃描 (SCAN)。
+
+用法: python scripts/check_query_plans.py [actions 筆數]
+有查詢使用全表掃描時以 exit code 1 結束。
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="query_plans_")
+DB_PATH = os.path.join(TMP_DIR, "game_records.db")
+os.environ["GAME_DB_PATH"] = DB_PATH
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import main  # noqa: E402  (會在暫存資料庫上套用 migrations)
+
+ACTIONS_PER_GAME = 50
+PLAYERS_PER_GAME = 5
+
+
+def populate(n_actions: int):
+    n_games = max(n_actions // ACTIONS_PER_GAME, 1)
+    n_players = max(n_games // 10, PLAYERS_PER_GAME)
+    rng = random.Random(42)
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA synchronous=OFF")
+    with conn:
+        conn.executemany(
+            "INSERT INTO players (username, nickname, total_games, total_wins, "
+            "total_losses, win_rate) VALUES (?, ?, 10, 5, 5, 50.0)",
+            ((f"synthetic_{i}", f"P{i}") for i in range(n_players)))
+        conn.executemany(
+            "INSERT INTO games (game_uuid, start_time, end_time, total_rounds, "
+            "winner_id, game_duration) VALUES (?, datetime('now', ?), "
+            "datetime('now'), 3, ?, 60)",
+            ((f"synthetic-game-{g}", f"-{g} minutes", rng.randint(1, n_players))
+             for g in range(n_games)))
+        conn.executemany(
+            "INSERT INTO game_participants (game_id, player_id, player_order, "
+            "final_rank) VALUES (?, ?, ?, ?)",
+            ((g + 1, rng.randint(1, n_players), i, i + 1)
+             for g in range(n_games) for i in range(PLAYERS_PER_GAME)))
+        conn.executemany(
+            "INSERT INTO actions (game_uuid, round_number, player_id, "
+            "action_type, numbers_called, hit_secret, timestamp) "
+            "VALUES (?, ?, ?, 'call', '[1]', 0, datetime('now', ?))",
+            ((f"synthetic-game-{a % n_games}", 1 + a % 3, a % n_players,
+              f"-{a} seconds") for a in range(n_actions)))
+        conn.execute("ANALYZE")
+    conn.close()
+    return n_games, n_players
+
+
+def collect_statements():
+    """執行實際的程式路徑並擷取所送出的 SQL"""
+    captured = []
+
+    main.database.set_trace_callback(captured.append)
+    game = main.GameState([
+        {"id": 1, "name": "A"}, {"id": 2, "name": "B"}, {"id": 3, "name": "C"},
+    ])
+    for player in game.players[1:]:
+        player.is_alive = False
+    game._update_game_end(game.players[0].id)
+    main.database.set_trace_callback(None)
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.set_trace_callback(captured.append)
+    c = conn.cursor()
+    main._query_player_stats(c, "synthetic_7")
+    main._query_game_details(c, "synthetic-game-7")
+    conn.close()
+
+    keywords = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+    return [s for s in captured if s.lstrip().upper().startswith(keywords)]
+
+
+def is_table_scan(detail: str, plan: list) -> bool:
+    """SCAN 一個實際資料表才算；VALUES 常數列與 CTE 的掃描不計"""
+    if not detail.startswith("SCAN ") or detail.endswith("CONSTANT ROWS"):
+        return False
+    target = detail.split()[1]
+    return f"MATERIALIZE {target}" not in plan
+
+
+def main_check(n_actions: int):
+    t0 = time.perf_counter()
+    n_games, n_players = populate(n_actions)
+    print(f"populated {n_actions} actions / {n_games} games / {n_players} players "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+    conn = sqlite3.connect(DB_PATH)
+    failures = 0
+    for statement in collect_statements():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement)]
+        scans = [detail for detail in plan if is_table_scan(detail, plan)]
+        status = "FAIL" if scans else "ok"
+        failures += bool(scans)
+        print(f"\n[{status}] {' '.join(statement.split())}")
+        for detail in plan:
+            print(f"    {detail}")
+    conn.close()
+
+    print(f"\n{failures} statement(s) with full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,34 @@
+"""
+列出每個提示在各回合範圍內排除的候選號碼數 (backend/hints.py 的預先計算表)，
+用來平衡提示強度。數字越大代表提示越強；範圍內不會出現的提示以 "-" 表示。
+
+用法: python scripts/hint_report.py [最多玩家人數]
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from hints import HINT_RULES, hint_tables  # noqa: E402
+
+# 第 1 / 2 / 3+ 回合的範圍 (GameState._start_round)
+ROUND_RANGES = [(1, 30), (1, 20), (1, 15)]
+
+
+def main(max_players):
+    header = "".join(f"{f'{lo}-{hi}/{pc}p':>9}" for pc in range(2, max_players + 1)
+                     for lo, hi in ROUND_RANGES)
+    print(f"{'rule':<12}{header}")
+    for i, rule in enumerate(HINT_RULES):
+        cells = []
+        for pc in range(2, max_players + 1):
+            for lo, hi in ROUND_RANGES:
+                report = hint_tables.elimination_report(lo, hi, pc)
+                text = rule.text(pc)
+                cells.append(f"{report[text]:>9}" if text in report else f"{'-':>9}")
+        print(f"{rule.key:<12}{''.join(cells)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,48 @@
+"""
+無 HTTP 的 AI 自我對戰 (backend/simulator.py)，回報 games/sec 與各難度勝率。
+
+預設不寫入資料庫 (GAME_DB_PATH 指到暫存檔)；加上 --persist 時寫入
+GAME_DB_PATH (未設定則為 backend 預設的 game_records.db)。
+
+用法: python scripts/simulate_games.py [場數] [--lineup easy,medium,hard]
+                                      [--workers N] [--seed S] [--persist]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless AI self-play simulator")
+    parser.add_argument("games", type=int, nargs="?", default=100000)
+    parser.add_argument("--lineup", default="easy,medium,hard",
+                        help="comma-separated difficulties, one per seat (2-5)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count, 1 = in-process)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--persist", action="store_true",
+                        help="write games and actions to GAME_DB_PATH")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    lineup = tuple(args.lineup.split(","))
+    if not 2 <= len(lineup) <= 5:
+        sys.exit("lineup must have 2-5 players")
+    if not args.persist:
+        os.environ["GAME_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="simulate_"),
+                                                  "game_records.db")
+
+    from simulator import run_simulation
+
+    result = run_simulation(args.games, lineup, workers=args.workers,
+                            persist=args.persist, seed=args.seed)
+    print(f"{result['games']} games in {result['seconds']:.1f}s "
+          f"({result['games_per_sec']:,.0f} games/s)")
+    for difficulty, rate in result["win_rate"].items():
+        print(f"  {difficulty:<8} win rate {rate:.1%}")
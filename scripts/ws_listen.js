@@ -19,6 +19,11 @@ ws.on('open', () => {
 ws.on('message', (data) => {
   try {
     const parsed = JSON.parse(data.toString());
+    // Reply to the server heartbeat so the listener is not evicted
+    if (parsed.type === 'ping') {
+      ws.send(JSON.stringify({ type: 'pong' }));
+      return;
+    }
     console.log('<<', JSON.stringify(parsed, null, 2));
   } catch (e) {
     console.log('<<', data.toString());
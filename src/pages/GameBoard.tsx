@@ -8,7 +8,7 @@ import { NumberGrid } from "@/components/NumberGrid";
 import { PlayerList } from "@/components/PlayerList";
 import { CircleSlash, RotateCcw, ArrowRight } from "lucide-react";
 import { gameApi } from "@/services/gameApi";
-import { GameState } from "@/types/game";
+import { CallNumberResponse, GameDelta, GameState, PassResponse, ReverseResponse } from "@/types/game";
 import { webSocketService } from "@/services/WebSocketService";
 import { toast } from "sonner";
 import { cn } from "@/lib/utils";
@@ -78,130 +78,60 @@ const GameBoard = () => {
     );
   }
 
-  useEffect(() => {
-    if (!gameState) return;
-
-    const currentPlayer = gameState.players.find((p) => p.id === gameState.current_player);
-
-    if (currentPlayer?.is_ai && !gameState.game_over) {
-      const performAiAction = async () => {
-        setIsProcessing(true);
-        // Simulate thinking time
-        await new Promise((resolve) => setTimeout(resolve, 1500));
-
-        try {
-          const response = await gameApi.aiAction(gameState.game_id);
-
-          // Handle response similar to human action
-          if ('hit_secret' in response && response.hit_secret) {
-            setIsExploding(true);
-            toast.error(`💥 踩雷了！${currentPlayer.name} 被淘汰！`, {
-              duration: 3000,
-            });
-            setTimeout(() => setIsExploding(false), EXPLOSION_DURATION_MS);
-          } else if ('action' in response && response.action === 'pass') { // Note: Backend response might need normalization or check specific fields
-            toast.success(`${currentPlayer.name} 使用了 Pass！`);
-          } else if ('new_direction' in response) {
-            toast.success(`${currentPlayer.name} 使用了迴轉！`);
-          } else {
-            const callResponse = response as any; // Type assertion if needed, or better check
-            if (callResponse.called_numbers) {
-              const numbers = callResponse.called_numbers.filter((n: number) => !gameState.called_numbers.includes(n));
-              // This logic is a bit complex because response returns ALL called numbers. 
-              // Better to just say AI acted.
-              toast.success(`${currentPlayer.name} 完成了行動`);
-            }
-          }
-
-          const updatedState = await gameApi.getGameStatus(gameState.game_id);
-          setGameState(updatedState);
-
-          if (updatedState.game_over) {
-            setTimeout(() => {
-              navigate("/result", { state: { gameState: updatedState, roomId } });
-            }, 2000);
-          }
-        } catch (error) {
-          console.error("AI Action failed:", error);
-          toast.error("AI 發生錯誤");
-        } finally {
-          setIsProcessing(false);
-        }
-      };
-
-      performAiAction();
-    }
-  }, [gameState?.current_player, gameState?.game_id]); // Only trigger when current player changes
-
   // Subscribe to room WebSocket updates so this board updates in real-time
   useEffect(() => {
     if (!roomId) return;
-    webSocketService.connect(`room_${roomId}`);
+    const roomChannel = `room_${roomId}`;
+    const requestSnapshot = (gameId: string) => {
+      webSocketService.send(roomChannel, { type: "game_snapshot_request", game_id: gameId });
+    };
+    webSocketService.connect(roomChannel);
     const unsubscribe = webSocketService.subscribe(async (data) => {
       try {
-        if (data.type === "room_update" && data.game) {
-          const incoming = data.game as GameState;
+        if (data.type === "room_update" && data.game_delta) {
+          const delta = data.game_delta as GameDelta;
 
-          // Partial merge: only update state if there are real differences
+          // Apply only the changed fields; on a sequence gap ask the server for a snapshot
           setGameState((prev) => {
-            if (!prev) return incoming;
-
-            const shallowEqual = (a: any, b: any) => JSON.stringify(a) === JSON.stringify(b);
-
-            const calledEqual = shallowEqual(prev.called_numbers, incoming.called_numbers);
-            const playersEqual = shallowEqual(prev.players, incoming.players);
-            const rangeEqual = shallowEqual(prev.number_range, incoming.number_range);
-            const roundEqual = prev.current_round === incoming.current_round;
-            const currentPlayerEqual = prev.current_player === incoming.current_player;
-            const directionEqual = prev.direction === incoming.direction;
-            const gameOverEqual = prev.game_over === incoming.game_over;
-
-            if (calledEqual && playersEqual && rangeEqual && roundEqual && currentPlayerEqual && directionEqual && gameOverEqual) {
-              // No effective changes
+            if (!prev || prev.game_id !== delta.game_id) return prev;
+            if (prev.seq !== undefined && delta.seq <= prev.seq) return prev; // stale / duplicate
+            if (prev.seq === undefined || !prev.action_history || delta.seq !== prev.seq + 1) {
+              requestSnapshot(delta.game_id);
               return prev;
             }
 
-            // Merge selectively to avoid wholesale replace where not needed
+            const changes = delta.changes;
+            if (Object.keys(changes).length === 0 && delta.actions.length === 0) {
+              return { ...prev, seq: delta.seq };
+            }
+
             const merged: GameState = {
               ...prev,
-              ...incoming,
-              // prefer arrays from incoming
-              called_numbers: incoming.called_numbers,
-              players: incoming.players,
+              ...changes,
+              seq: delta.seq,
+              action_history: [...prev.action_history, ...delta.actions],
+              last_action: delta.actions.length > 0 ? delta.actions[delta.actions.length - 1] : prev.last_action,
             };
 
             // If incoming indicates game over, navigate after state update
-            if (incoming.game_over) {
+            if (merged.game_over) {
               setTimeout(() => {
                 navigate("/result", { state: { gameState: merged, roomId } });
               }, 800);
             }
 
-            // Detect newly called numbers so everyone can see who chose which numbers
+            // Show who chose which numbers
             try {
-              const prevCalled = prev.called_numbers || [];
-              const incomingCalled = incoming.called_numbers || [];
-              const newCalled = incomingCalled.filter((n) => !prevCalled.includes(n));
-
-              // Prefer explicit last_action from server if present
-              const lastAction = (incoming as any).last_action;
+              const lastAction = delta.actions[delta.actions.length - 1];
               if (lastAction && lastAction.action_type === "call" && lastAction.numbers && lastAction.numbers.length > 0) {
                 const actorId = lastAction.player_id;
-                const actor = incoming.players.find((p) => p.id === actorId) || prev.players.find((p) => p.id === actorId);
+                const actor = merged.players.find((p) => p.id === actorId);
                 const actorName = actor?.name || "玩家";
                 const numbers = lastAction.numbers as number[];
                 // show toast and highlight temporarily
                 toast.info(`${actorName} 選擇了 ${numbers.join(", ")}`);
                 setRecentCall({ playerId: actorId, numbers });
                 setTimeout(() => setRecentCall(null), 2500);
-              } else if (newCalled.length > 0) {
-                // fallback: guess actor as previous current_player
-                const actorId = prev.current_player;
-                const actor = incoming.players.find((p) => p.id === actorId) || prev.players.find((p) => p.id === actorId);
-                const actorName = actor?.name || "玩家";
-                toast.info(`${actorName} 選擇了 ${newCalled.join(", ")}`);
-                setRecentCall({ playerId: actorId, numbers: newCalled });
-                setTimeout(() => setRecentCall(null), 2500);
               }
             } catch (e) {
               // non-fatal
@@ -210,6 +140,47 @@ const GameBoard = () => {
             return merged;
           });
 
+        } else if (data.type === "game_snapshot" && data.game) {
+          const snapshot = data.game as GameState;
+          setGameState((prev) => {
+            if (prev && prev.game_id !== snapshot.game_id) return prev;
+            if (prev && prev.seq !== undefined && prev.action_history && snapshot.seq! < prev.seq) return prev;
+            if (snapshot.game_over) {
+              setTimeout(() => {
+                navigate("/result", { state: { gameState: snapshot, roomId } });
+              }, 800);
+            }
+            return snapshot;
+          });
+
+        } else if (data.type === "ai_action" && data.result) {
+          // AI turns run on the server; state arrives via game_delta, this only announces the result
+          const result = data.result;
+          setGameState((prev) => {
+            if (!prev || prev.game_id !== data.game_id) return prev;
+            const actorName = prev.players.find((p) => p.id === data.player_id)?.name || "AI";
+            if (result.hit_secret) {
+              setIsExploding(true);
+              toast.error(`💥 踩雷了！${actorName} 被淘汰！`, {
+                duration: 3000,
+              });
+              setTimeout(() => setIsExploding(false), EXPLOSION_DURATION_MS);
+            } else if (data.action?.action === "pass") {
+              toast.success(`${actorName} 使用了 Pass！`);
+            } else if (data.action?.action === "reverse") {
+              toast.success(`${actorName} 使用了迴轉！`);
+            }
+            return prev;
+          });
+
+          if (result.game_over) {
+            const finalState = await gameApi.getGameStatus(data.game_id);
+            setGameState(finalState);
+            setTimeout(() => {
+              navigate("/result", { state: { gameState: finalState, roomId } });
+            }, 2000);
+          }
+
         } else if (data.type === "game_started") {
           if (data.game_id) {
             const s = await gameApi.getGameStatus(data.game_id);
@@ -305,7 +276,7 @@ const GameBoard = () => {
 
     setIsProcessing(true);
     try {
-      const response = await gameApi.callNumbers({
+      const { result: response, viaSocket } = await gameApi.roomAction<CallNumberResponse>(roomId, "call", {
         game_id: gameState.game_id,
         player_id: gameState.current_player,
         numbers: selectedNumbers,
@@ -325,16 +296,20 @@ const GameBoard = () => {
         toast.success("安全！");
       }
 
-      // Update game state
-      const updatedState = await gameApi.getGameStatus(gameState.game_id);
-      setGameState(updatedState);
       setSelectedNumbers([]);
 
-      // Check if game is over
-      if (updatedState.game_over) {
-        setTimeout(() => {
-          navigate("/result", { state: { gameState: updatedState, roomId } });
-        }, 2000);
+      // Over the room socket the game_delta was applied before the ack arrived;
+      // the final move of a game carries no delta, so fetch the final state then.
+      if (!viaSocket || response.game_over) {
+        const updatedState = await gameApi.getGameStatus(gameState.game_id);
+        setGameState(updatedState);
+
+        // Check if game is over
+        if (updatedState.game_over) {
+          setTimeout(() => {
+            navigate("/result", { state: { gameState: updatedState, roomId } });
+          }, 2000);
+        }
       }
     } catch (error) {
       console.error("Failed to call numbers:", error);
@@ -353,15 +328,17 @@ const GameBoard = () => {
 
     setIsProcessing(true);
     try {
-      await gameApi.pass({
+      const { viaSocket } = await gameApi.roomAction<PassResponse>(roomId, "pass", {
         game_id: gameState.game_id,
         player_id: gameState.current_player,
       });
 
       toast.success(`${currentPlayer?.name} 使用了 Pass！`);
 
-      const updatedState = await gameApi.getGameStatus(gameState.game_id);
-      setGameState(updatedState);
+      if (!viaSocket) {
+        const updatedState = await gameApi.getGameStatus(gameState.game_id);
+        setGameState(updatedState);
+      }
     } catch (error) {
       console.error("Failed to pass:", error);
       toast.error("操作失敗，請重試");
@@ -379,15 +356,17 @@ const GameBoard = () => {
 
     setIsProcessing(true);
     try {
-      await gameApi.reverse({
+      const { viaSocket } = await gameApi.roomAction<ReverseResponse>(roomId, "reverse", {
         game_id: gameState.game_id,
         player_id: gameState.current_player,
       });
 
       toast.success(`${currentPlayer?.name} 使用了迴轉！順序反轉！`);
 
-      const updatedState = await gameApi.getGameStatus(gameState.game_id);
-      setGameState(updatedState);
+      if (!viaSocket) {
+        const updatedState = await gameApi.getGameStatus(gameState.game_id);
+        setGameState(updatedState);
+      }
     } catch (error) {
       console.error("Failed to reverse:", error);
       toast.error("操作失敗，請重試");
@@ -452,7 +431,7 @@ const GameBoard = () => {
               player={currentPlayer}
               isActive={true}
               isLarge={true}
-              status={isProcessing && currentPlayer.is_ai ? "AI 思考中..." : (!isMyTurn && !currentPlayer.is_ai ? "等待對手行動..." : undefined)}
+              status={currentPlayer.is_ai && !gameState.game_over ? "AI 思考中..." : (!isMyTurn && !currentPlayer.is_ai ? "等待對手行動..." : undefined)}
             />
           </div>
         )}
@@ -42,8 +42,16 @@ const RoomLobby = () => {
 
         webSocketService.connect("lobby");
         const unsubscribe = webSocketService.subscribe((data) => {
-            if (data.type === "lobby_update") {
-                fetchRooms();
+            if (data.type === "rooms_updated") {
+                // Server sends coalesced summaries of changed rooms; merge them in place
+                const updated: Room[] = data.rooms || [];
+                const removed: number[] = data.removed || [];
+                setRooms((prev) => {
+                    const byId = new Map(prev.map((r) => [r.room_id, r]));
+                    removed.forEach((id) => byId.delete(id));
+                    updated.forEach((r) => byId.set(r.room_id, r));
+                    return Array.from(byId.values());
+                });
             }
         }, "lobby");
 
@@ -1,5 +1,19 @@
 type MessageHandler = (data: any) => void;
 
+type PendingRequest = {
+    resolve: (result: any) => void;
+    reject: (error: Error) => void;
+    timer: number;
+};
+
+export class WebSocketRequestError extends Error {
+    constructor(message: string, public status: number, public detail: any) {
+        super(message);
+    }
+}
+
+const REQUEST_TIMEOUT_MS = 5000;
+
 type ConnectionEntry = {
     ws: WebSocket;
     handlers: MessageHandler[];
@@ -8,11 +22,15 @@ type ConnectionEntry = {
     refCount: number;
     debounceTimer: number | null;
     lastMessage: any | null;
+    pending: Record<string, PendingRequest>;
 };
 
 class WebSocketService {
     private connections: Record<string, ConnectionEntry> = {};
     private baseUrl: string;
+    // request_id only has to be unique per socket; a counter also works in
+    // insecure contexts, where crypto.randomUUID() is unavailable
+    private nextRequestId = 0;
 
     constructor() {
         const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
@@ -47,6 +65,7 @@ class WebSocketService {
             refCount: 1,
             debounceTimer: null,
             lastMessage: null,
+            pending: {},
         };
 
         // attach optional debounceMs
@@ -61,6 +80,24 @@ class WebSocketService {
         ws.onmessage = (event) => {
             try {
                 const data = JSON.parse(event.data);
+                // Server heartbeat: reply so the connection is not evicted as half-open
+                if (data.type === "ping") {
+                    ws.send(JSON.stringify({ type: "pong" }));
+                    return;
+                }
+                // Acknowledgement of a request() call: settle it instead of dispatching
+                if (data.type === "game_action_ack" && entry.pending[data.request_id]) {
+                    const pending = entry.pending[data.request_id];
+                    delete entry.pending[data.request_id];
+                    clearTimeout(pending.timer);
+                    if (data.ok) {
+                        pending.resolve(data.result);
+                    } else {
+                        const message = typeof data.detail === "string" ? data.detail : "Request failed";
+                        pending.reject(new WebSocketRequestError(message, data.status, data.detail));
+                    }
+                    return;
+                }
                 // Dispatch immediately without debounce
                 entry.handlers.slice().forEach((h) => {
                     try {
@@ -76,6 +113,11 @@ class WebSocketService {
 
         ws.onclose = () => {
             console.log(`WebSocket disconnected: ${clientType}`);
+            Object.values(entry.pending).forEach((pending) => {
+                clearTimeout(pending.timer);
+                pending.reject(new Error(`WebSocket ${clientType} closed`));
+            });
+            entry.pending = {};
             if (entry.shouldReconnect) {
                 setTimeout(() => {
                     // Clean up old entry before reconnect
@@ -152,6 +194,45 @@ class WebSocketService {
         };
     }
 
+    send(clientType: string, message: any) {
+        const entry = this.connections[clientType];
+        if (!entry || entry.ws.readyState !== WebSocket.OPEN) {
+            console.warn(`WebSocket ${clientType} is not open; dropping message`, message);
+            return false;
+        }
+        entry.ws.send(JSON.stringify(message));
+        return true;
+    }
+
+    isOpen(clientType: string) {
+        const entry = this.connections[clientType];
+        return !!entry && entry.ws.readyState === WebSocket.OPEN;
+    }
+
+    // Send a message tagged with a request_id and wait for the matching
+    // game_action_ack. Rejects if the socket is not open, closes, or times out.
+    request(clientType: string, message: any, timeoutMs: number = REQUEST_TIMEOUT_MS): Promise<any> {
+        const entry = this.connections[clientType];
+        if (!entry || entry.ws.readyState !== WebSocket.OPEN) {
+            return Promise.reject(new Error(`WebSocket ${clientType} is not open`));
+        }
+        const requestId = String(++this.nextRequestId);
+        return new Promise((resolve, reject) => {
+            const timer = window.setTimeout(() => {
+                delete entry.pending[requestId];
+                reject(new Error(`WebSocket request ${requestId} timed out`));
+            }, timeoutMs);
+            entry.pending[requestId] = { resolve, reject, timer };
+            try {
+                entry.ws.send(JSON.stringify({ ...message, request_id: requestId }));
+            } catch (e) {
+                clearTimeout(timer);
+                delete entry.pending[requestId];
+                reject(e instanceof Error ? e : new Error(String(e)));
+            }
+        });
+    }
+
     // Allow adjusting debounce time for a given clientType after connection
     setDebounce(clientType: string, ms: number) {
         const entry = this.connections[clientType];
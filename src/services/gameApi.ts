@@ -9,6 +9,7 @@ import {
   ReverseResponse,
   GameState,
 } from "@/types/game";
+import { WebSocketRequestError, webSocketService } from "@/services/WebSocketService";
 
 export interface Room {
   room_id: number;
@@ -20,6 +21,7 @@ export interface Room {
   game_id?: string;
   has_password?: boolean;
   host_id?: number;
+  last_activity?: string;
 }
 
 export interface JoinRoomResponse {
@@ -96,6 +98,34 @@ export const gameApi = {
     return response.json();
   },
 
+  // In a room, send the move over the room WebSocket (one socket round-trip;
+  // the room_update delta arrives before the ack). Falls back to HTTP when the
+  // socket is not open, or when the socket request fails without a server
+  // answer (send error, close, timeout); a rejected move is not retried.
+  // Returns whether the socket was used.
+  async roomAction<T>(
+    roomId: string | undefined,
+    action: "call" | "pass" | "reverse",
+    request: CallNumberRequest | PassRequest | ReverseRequest,
+  ): Promise<{ result: T; viaSocket: boolean }> {
+    const channel = `room_${roomId}`;
+    if (roomId && webSocketService.isOpen(channel)) {
+      try {
+        const result = await webSocketService.request(channel, { type: "game_action", action, ...request });
+        return { result, viaSocket: true };
+      } catch (e) {
+        if (e instanceof WebSocketRequestError) throw e;
+        console.warn("Room socket request failed, retrying over HTTP", e);
+      }
+    }
+    const result = action === "call"
+      ? await gameApi.callNumbers(request as CallNumberRequest)
+      : action === "pass"
+        ? await gameApi.pass(request)
+        : await gameApi.reverse(request);
+    return { result: result as T, viaSocket: false };
+  },
+
   async getGameStatus(gameId: string): Promise<GameState> {
     const response = await fetch(`${API_BASE_URL}/game/status?game_id=${gameId}`);
     if (!response.ok) throw new Error("Failed to get game status");
@@ -110,8 +140,8 @@ export const gameApi = {
     return response.json();
   },
 
-  async getLeaderboard(limit: number = 10) {
-    const response = await fetch(`${API_BASE_URL}/stats/leaderboard?limit=${limit}`);
+  async getLeaderboard(limit: number = 10, offset: number = 0) {
+    const response = await fetch(`${API_BASE_URL}/stats/leaderboard?limit=${limit}&offset=${offset}`);
     if (!response.ok) throw new Error("Failed to get leaderboard");
     return response.json();
   },
@@ -129,8 +159,19 @@ export const gameApi = {
   },
 
   // Room APIs
-  async getRooms(): Promise<{ rooms: Room[] }> {
-    const response = await fetch(`${API_BASE_URL}/rooms`);
+  async getRooms(query?: {
+    status?: "waiting" | "playing" | "full";
+    has_password?: boolean;
+    min_free_slots?: number;
+    limit?: number;
+    cursor?: string;
+  }): Promise<{ rooms: Room[]; next_cursor: string | null }> {
+    const params = new URLSearchParams();
+    Object.entries(query || {}).forEach(([key, value]) => {
+      if (value !== undefined) params.set(key, String(value));
+    });
+    const qs = params.toString();
+    const response = await fetch(`${API_BASE_URL}/rooms${qs ? `?${qs}` : ""}`);
     if (!response.ok) throw new Error("Failed to get rooms");
     return response.json();
   },
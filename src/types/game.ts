@@ -19,6 +19,16 @@ export interface GameState {
   winner?: number;
   hints?: string[]; // 遊戲提示
   action_history?: GameAction[]; // 行動記錄
+  last_action?: GameAction | null;
+  seq?: number; // 最後套用的 game_delta 序號
+}
+
+// room_update 內附帶的遊戲差異：只包含變動欄位與新增行動
+export interface GameDelta {
+  game_id: string;
+  seq: number;
+  changes: Partial<Omit<GameState, "game_id" | "seq" | "action_history">>;
+  actions: GameAction[];
 }
 
 export interface GameAction {